@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+
+# One document per UTC day: {_id: <midnight datetime>, revenue, orders}
+SALES_ROLLUP_COLLECTION = "sales_daily"
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def day_bucket(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def period_start(day: datetime, granularity: str) -> datetime:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start: datetime, granularity: str) -> datetime:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+async def record_order_sales(db, order_time: datetime, total: float, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) one order from its day's rollup bucket"""
+    await db[SALES_ROLLUP_COLLECTION].update_one(
+        {"_id": day_bucket(order_time)},
+        {"$inc": {"revenue": sign * float(total), "orders": sign}},
+        upsert=True
+    )
+
+
+async def get_sales_series(db, start: datetime, end: datetime, granularity: str = "day"):
+    """Revenue, order count and average basket per period over [start, end], zero-filled"""
+    start, end = day_bucket(start), day_bucket(end)
+    buckets = await db[SALES_ROLLUP_COLLECTION].find(
+        {"_id": {"$gte": start, "$lte": end}}
+    ).to_list(None)
+
+    periods = {}
+    for bucket in buckets:
+        key = period_start(bucket["_id"], granularity)
+        period = periods.setdefault(key, {"revenue": 0.0, "orders": 0})
+        period["revenue"] += bucket.get("revenue", 0.0)
+        period["orders"] += bucket.get("orders", 0)
+
+    series = []
+    current = period_start(start, granularity)
+    while current <= end:
+        period = periods.get(current, {"revenue": 0.0, "orders": 0})
+        orders = period["orders"]
+        series.append({
+            "period_start": current,
+            "revenue": round(period["revenue"], 2),
+            "orders": orders,
+            "average_basket": round(period["revenue"] / orders, 2) if orders else 0.0
+        })
+        current = next_period(current, granularity)
+    return series
+
+
+async def rebuild_daily_sales(db, batch_size: int = 5000):
+    """
+    Rebuild the rollup from `orders` in _id-ordered batches into a scratch
+    collection, then swap it in. Batches walk _id upward until none remain, so
+    orders created during the rebuild are included; cancellations of already
+    processed orders during the run are not, so run it off-peak.
+    """
+    scratch = db[f"{SALES_ROLLUP_COLLECTION}_rebuild"]
+    await scratch.drop()
+
+    last_id = None
+    processed = 0
+    while True:
+        query = {"status": {"$ne": "cancelled"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        orders = await db.orders.find(
+            query, {"order_time": 1, "total": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not orders:
+            break
+
+        days = {}
+        for order in orders:
+            if not order.get("order_time"):
+                continue
+            day = days.setdefault(day_bucket(order["order_time"]), {"revenue": 0.0, "orders": 0})
+            day["revenue"] += float(order.get("total", 0.0))
+            day["orders"] += 1
+
+        if days:
+            await scratch.bulk_write([
+                UpdateOne({"_id": day}, {"$inc": values}, upsert=True)
+                for day, values in days.items()
+            ], ordered=False)
+
+        last_id = orders[-1]["_id"]
+        processed += len(orders)
+
+    if processed:
+        await scratch.rename(SALES_ROLLUP_COLLECTION, dropTarget=True)
+    else:
+        await scratch.drop()
+        await db[SALES_ROLLUP_COLLECTION].delete_many({})
+    return processed
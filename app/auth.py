@@ -1,9 +1,22 @@
 from passlib.context import CryptContext
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import JWTError, ExpiredSignatureError, jwt
 from app.database import settings
+import base64
 import hashlib
+import hmac
+import logging
+import time
+import orjson
+
+try:
+    import jwt as pyjwt
+except ImportError:  # PyJWT is optional; only used with JWT_BACKEND=pyjwt
+    pyjwt = None
+
+logger = logging.getLogger(__name__)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
 
@@ -31,9 +44,132 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def verify_token(token: str):
+# ============= TOKEN VERIFICATION =============
+
+HMAC_ALGORITHMS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+def decode_with_jose(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+def decode_with_pyjwt(token: str) -> dict:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
-        return None
+        return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except pyjwt.PyJWTError as e:
+        raise JWTError(str(e))
+
+
+def b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def decode_native(token: str) -> dict:
+    """
+    HS256/384/512 only: checks the header alg, the HMAC signature (constant
+    time), exp and nbf - the same checks jose applies to our tokens, without
+    its generic claim and key handling.
+    """
+    try:
+        header_segment, payload_segment, signature_segment = token.split(".")
+        header = orjson.loads(b64url_decode(header_segment))
+        if header.get("alg") != settings.ALGORITHM:
+            raise JWTError("The specified alg value is not allowed")
+        expected = hmac.new(
+            settings.SECRET_KEY.encode(),
+            f"{header_segment}.{payload_segment}".encode(),
+            HMAC_ALGORITHMS[settings.ALGORITHM]
+        ).digest()
+        if not hmac.compare_digest(expected, b64url_decode(signature_segment)):
+            raise JWTError("Signature verification failed")
+        payload = orjson.loads(b64url_decode(payload_segment))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise JWTError(f"Invalid token: {e}")
+
+    if not isinstance(payload, dict):
+        raise JWTError("Invalid payload")
+    now = time.time()
+    if "exp" in payload:
+        if not isinstance(payload["exp"], (int, float)):
+            raise JWTError("Expiration Time claim (exp) must be a number")
+        if payload["exp"] < now:
+            raise ExpiredSignatureError("Signature has expired")
+    if "nbf" in payload:
+        if not isinstance(payload["nbf"], (int, float)):
+            raise JWTError("Not Before claim (nbf) must be a number")
+        if payload["nbf"] > now:
+            raise JWTError("The token is not yet valid (nbf)")
+    return payload
+
+
+def select_decoder():
+    backend = settings.JWT_BACKEND.lower()
+    if backend == "native" and settings.ALGORITHM in HMAC_ALGORITHMS:
+        return decode_native
+    if backend == "pyjwt" and pyjwt is not None:
+        return decode_with_pyjwt
+    if backend != "jose":
+        logger.warning(f"JWT_BACKEND={settings.JWT_BACKEND} unavailable for {settings.ALGORITHM}; using python-jose")
+    return decode_with_jose
+
+
+decode_token = select_decoder()
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified claims keyed by the token's SHA-256 digest, so a
+    token seen again skips signature verification until it expires. Only
+    valid tokens are cached; garbage tokens can't evict real ones.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # digest -> (claims, exp)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes) -> Optional[dict]:
+        entry = self.entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        claims, exp = entry
+        if exp is not None and exp < time.time():
+            del self.entries[digest]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(digest)
+        self.hits += 1
+        return claims
+
+    def put(self, digest: bytes, claims: dict):
+        exp = claims.get("exp")
+        self.entries[digest] = (claims, exp if isinstance(exp, (int, float)) else None)
+        self.entries.move_to_end(digest)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+token_cache = TokenCache(settings.JWT_CACHE_SIZE)
+
+
+def verify_token(token: str):
+    if token_cache.max_size <= 0:
+        try:
+            return decode_token(token)
+        except JWTError:
+            return None
+
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is None:
+        try:
+            claims = decode_token(token)
+        except JWTError:
+            return None
+        token_cache.put(digest, claims)
+    return dict(claims)  # Callers may modify their copy
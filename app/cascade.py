@@ -0,0 +1,109 @@
+import asyncio
+from app.database import settings
+from app.jobs import JobQueue
+from app.customer_stats import USER_ORDER_STATS_COLLECTION
+from app.rankings import RANKINGS_COLLECTION
+
+JOBS_COLLECTION = "cascade_jobs"
+
+# Reviews outlive their author so item ratings stay intact
+REVIEW_TOMBSTONE = {"username": "Deleted user", "author_deleted": True}
+
+
+def matching(field: str, prefix: str = ""):
+    async def query(db, ref_id: str) -> dict:
+        return {field: f"{prefix}{ref_id}"}
+    return query
+
+
+async def user_cart_items(db, user_id: str) -> dict:
+    cart_ids = [str(cart["_id"]) async for cart in db.carts.find({"user_id": user_id}, {"_id": 1})]
+    return {"cart_id": {"$in": cart_ids}}
+
+
+async def reviews_to_tombstone(db, user_id: str) -> dict:
+    return {"user_id": user_id, "author_deleted": {"$ne": True}}
+
+
+def tombstone_review(ref_id: str) -> dict:
+    return {"$set": REVIEW_TOMBSTONE}
+
+
+def pull_guest_wishlist_id(ref_id: str) -> dict:
+    return {"$pull": {"items": ref_id}}
+
+
+def pull_guest_wishlist_item(ref_id: str) -> dict:
+    return {"$pull": {"items": {"inventory_id": ref_id}}}
+
+
+# kind -> ordered steps of (name, collection, query for (db, ref_id), update for ref_id).
+# update None deletes the matching documents; otherwise the update is applied to
+# them and must stop them matching. Orders and order items are kept as records.
+CASCADES = {
+    "user": [
+        # Items before the carts that lead to them
+        ("cart_items", "cart_items", user_cart_items, None),
+        ("carts", "carts", matching("user_id"), None),
+        ("wishlist", "wishlist", matching("user_id"), None),
+        ("pet_profiles", "user_pet_profiles", matching("user_id"), None),
+        ("reviews", "reviews", reviews_to_tombstone, tombstone_review),
+        ("order_stats", USER_ORDER_STATS_COLLECTION, matching("_id"), None),
+    ],
+    "inventory": [
+        ("cart_items", "cart_items", matching("inventory_id"), None),
+        ("wishlist", "wishlist", matching("inventory_id"), None),
+        # Guests sync their wishlist as a list of ids or of {inventory_id} objects
+        ("guest_wishlist_ids", "guest_wishlists", matching("items"), pull_guest_wishlist_id),
+        ("guest_wishlist_items", "guest_wishlists", matching("items.inventory_id"), pull_guest_wishlist_item),
+        ("reviews", "reviews", matching("inventory_id"), None),
+        ("rankings", RANKINGS_COLLECTION, matching("_id", prefix="item:"), None),
+    ],
+}
+
+
+async def enqueue_cascade(db, kind: str, ref_id: str) -> str:
+    """Queue removal of everything that references a deleted user or inventory item"""
+    return await cascade_jobs.enqueue(db, {
+        "kind": kind,
+        "ref_id": ref_id,
+        "steps": {name: {"affected": 0, "done": False} for name, _, _, _ in CASCADES[kind]},
+    })
+
+
+async def process_cascade(db, job: dict):
+    """
+    Run each step in throttled _id batches. Every batch removes what it
+    matched from the step's query, so a job resumed after a restart simply
+    finds what is left.
+    """
+    batch_size = settings.CASCADE_BATCH_SIZE
+    ref_id = job["ref_id"]
+    for name, collection, build_query, update in CASCADES[job["kind"]]:
+        if job["steps"].get(name, {}).get("done"):
+            continue
+        query = await build_query(db, ref_id)
+
+        while True:
+            batch = await db[collection].find(query, {"_id": 1}).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            ids = {"_id": {"$in": [doc["_id"] for doc in batch]}}
+            if update is None:
+                result = await db[collection].delete_many(ids)
+                affected = result.deleted_count
+            else:
+                result = await db[collection].update_many(ids, update(ref_id))
+                affected = result.modified_count
+            await cascade_jobs.progress(db, job["_id"], inc={f"steps.{name}.affected": affected})
+            await asyncio.sleep(settings.CASCADE_BATCH_PAUSE_SECONDS)
+
+        await cascade_jobs.progress(db, job["_id"], set_fields={f"steps.{name}.done": True})
+
+
+cascade_jobs = JobQueue(
+    JOBS_COLLECTION, process_cascade,
+    poll_seconds=settings.CASCADE_POLL_SECONDS,
+    lease_seconds=settings.CASCADE_LEASE_SECONDS,
+    max_attempts=settings.CASCADE_MAX_ATTEMPTS
+)
@@ -0,0 +1,141 @@
+import asyncio
+import gzip
+from app.database import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+
+# (gzip level, brotli quality) per content type. Large repetitive JSON compresses
+# well at moderate levels; the top levels cost far more CPU for a few % of bytes.
+COMPRESSION_LEVELS = {
+    "application/json": (6, 5),
+    "text/html": (6, 5),
+    "text/plain": (6, 5),
+    "text/css": (6, 6),
+    "application/javascript": (6, 6),
+}
+
+# Streaming responses (SSE) must reach the client unbuffered
+NEVER_COMPRESS = {"text/event-stream"}
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """Map each accepted encoding to its q-value"""
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str):
+    accepted = parse_accept_encoding(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, content_type: str) -> bytes:
+    gzip_level, brotli_quality = COMPRESSION_LEVELS.get(content_type, (6, 5))
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli response compression for complete (non-streaming) bodies.
+
+    Bodies under COMPRESSION_MINIMUM_SIZE are sent as-is; bodies over
+    COMPRESSION_OFFLOAD_SIZE are compressed in a worker thread so the event
+    loop keeps serving other requests meanwhile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # HEAD responses have no body but must keep the GET Content-Length
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body_parts = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                response_headers = dict(message.get("headers") or [])
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip()
+                if (
+                    b"content-encoding" in response_headers
+                    or content_type in NEVER_COMPRESS
+                    or content_type not in COMPRESSION_LEVELS
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            if not body:
+                # Nothing to compress (e.g. 204/304); keep the app's headers as sent
+                await send(start_message)
+                await send(message)
+                return
+            response_headers = [
+                (k, v) for k, v in start_message.get("headers", [])
+                if k not in (b"content-length", b"vary")
+            ]
+            vary = dict(start_message.get("headers", [])).get(b"vary")
+            response_headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+
+            if len(body) >= settings.COMPRESSION_MINIMUM_SIZE:
+                content_type = dict(start_message["headers"]).get(b"content-type", b"").decode("latin-1").split(";")[0].strip()
+                if len(body) >= settings.COMPRESSION_OFFLOAD_SIZE:
+                    body = await asyncio.to_thread(compress, body, encoding, content_type)
+                else:
+                    body = compress(body, encoding, content_type)
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+
+            response_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,174 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+
+# One document per customer: {_id: <user id>, order_count, total_spent, last_order_time,
+# seeded_through}. Cancelled orders are not counted. seeded_through is the
+# newest order _id the document was seeded with from `orders`; orders up to it
+# are already included, later ones are added as they are placed.
+USER_ORDER_STATS_COLLECTION = "user_order_stats"
+
+EMPTY_STATS = {"order_count": 0, "total_spent": 0.0, "last_order_time": None}
+
+
+async def seed_user_order_stats(db, user_id: str, through: ObjectId) -> bool:
+    """
+    Create the customer's counters from their orders with _id <= through.
+    False if the document already exists (created concurrently); it is left as is.
+    """
+    seeded = (await aggregate_user_orders(db, [user_id], through=through)).get(user_id, EMPTY_STATS)
+    result = await db[USER_ORDER_STATS_COLLECTION].update_one(
+        {"_id": user_id}, {"$setOnInsert": {**seeded, "seeded_through": through}}, upsert=True
+    )
+    return result.upserted_id is not None
+
+
+async def record_user_order(db, user_id: str, order_id: ObjectId, order_time: datetime, total: float, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) one order from its customer's running
+    totals. A customer without counters yet (e.g. with orders from before
+    counters existed) is seeded from `orders` instead, which already
+    reflects this order.
+    """
+    stats = db[USER_ORDER_STATS_COLLECTION]
+    if sign > 0:
+        # Skip orders the seed already counted
+        query = {"_id": user_id, "seeded_through": {"$not": {"$gte": order_id}}}
+        update = {
+            "$inc": {"order_count": 1, "total_spent": float(total)},
+            "$max": {"last_order_time": order_time},
+        }
+        result = await stats.update_one(query, update)
+        if result.matched_count == 0 and not await seed_user_order_stats(db, user_id, order_id):
+            # Seeded concurrently by another request; counts this order only if it was newer
+            await stats.update_one(query, update)
+        return
+
+    result = await stats.update_one(
+        {"_id": user_id}, {"$inc": {"order_count": -1, "total_spent": -float(total)}}
+    )
+    if result.matched_count == 0:
+        # The order is already cancelled/deleted, so the seed leaves it out
+        await seed_user_order_stats(db, user_id, ObjectId())
+        return
+
+    # Only the latest order moves last_order_time back; an order placed in
+    # the meantime has already raised it past order_time, so the guard misses
+    latest = await db.orders.find_one(
+        {"user_id": user_id, "status": {"$ne": "cancelled"}},
+        {"order_time": 1},
+        sort=[("order_time", -1)]
+    )
+    await stats.update_one(
+        {"_id": user_id, "last_order_time": order_time},
+        {"$set": {"last_order_time": latest.get("order_time") if latest else None}}
+    )
+
+
+async def aggregate_user_orders(db, user_ids, through: ObjectId = None) -> dict:
+    """Totals per user straight from `orders` (the source the counters are checked against)"""
+    match = {"user_id": {"$in": list(user_ids)}, "status": {"$ne": "cancelled"}}
+    if through is not None:
+        match["_id"] = {"$lte": through}
+    return {
+        group["_id"]: {
+            "order_count": group["order_count"],
+            "total_spent": round(group["total_spent"], 2),
+            "last_order_time": group["last_order_time"],
+        }
+        async for group in db.orders.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": "$user_id",
+                "order_count": {"$sum": 1},
+                "total_spent": {"$sum": {"$ifNull": ["$total", 0]}},
+                "last_order_time": {"$max": "$order_time"}
+            }}
+        ])
+    }
+
+
+async def seed_missing_user_order_stats(db, user_ids) -> dict:
+    """
+    Seed counters for users that have none yet, from one aggregation over
+    their orders. Returns {user_id: counters} as stored afterwards.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    stats = db[USER_ORDER_STATS_COLLECTION]
+    through = ObjectId()
+    seeded = await aggregate_user_orders(db, user_ids, through=through)
+    await stats.bulk_write([
+        UpdateOne(
+            {"_id": user_id},
+            {"$setOnInsert": {**seeded.get(user_id, EMPTY_STATS), "seeded_through": through}},
+            upsert=True
+        )
+        for user_id in user_ids
+    ], ordered=False)
+    return {doc["_id"]: doc async for doc in stats.find({"_id": {"$in": user_ids}})}
+
+
+async def get_user_order_stats(db, user_id: str) -> dict:
+    """The customer's counters, seeded from `orders` if they have none yet"""
+    stats = await db[USER_ORDER_STATS_COLLECTION].find_one({"_id": user_id})
+    if stats is None:
+        await seed_user_order_stats(db, user_id, ObjectId())
+        stats = await db[USER_ORDER_STATS_COLLECTION].find_one({"_id": user_id}) or EMPTY_STATS
+    return stats
+
+
+async def reconcile_user_order_stats(db, batch_size: int = 500, fix: bool = True, max_details: int = 100) -> dict:
+    """
+    Compare every user's counters with their non-cancelled orders in
+    _id-ordered batches and (with fix=True) rewrite the ones that drifted
+    and seed users that have no counters yet. An order placed or
+    cancelled between the two reads of a batch leaves that user for the next
+    run rather than being overwritten.
+    """
+    stats = db[USER_ORDER_STATS_COLLECTION]
+    checked = 0
+    mismatched = 0
+    details = []
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        users = await db.users.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not users:
+            break
+        last_id = users[-1]["_id"]
+        checked += len(users)
+
+        user_ids = [str(user["_id"]) for user in users]
+        stored_by_user = {doc["_id"]: doc async for doc in stats.find({"_id": {"$in": user_ids}})}
+        actual = await aggregate_user_orders(db, user_ids)
+
+        fixes = []
+        missing = []
+        for user_id in user_ids:
+            expected = actual.get(user_id, EMPTY_STATS)
+            doc = stored_by_user.get(user_id)
+            stored = {field: doc.get(field) for field in EMPTY_STATS} if doc else dict(EMPTY_STATS)
+            if stored["total_spent"] is not None:
+                stored["total_spent"] = round(stored["total_spent"], 2)
+            if stored == expected:
+                continue
+            mismatched += 1
+            if len(details) < max_details:
+                details.append({"user_id": user_id, "stored": stored, "expected": expected})
+            if doc is None:
+                missing.append(user_id)
+            else:
+                # Only overwrite if no order changed the counters since they were read
+                fixes.append(UpdateOne(
+                    {"_id": user_id, "order_count": doc.get("order_count"), "total_spent": doc.get("total_spent")},
+                    {"$set": expected}
+                ))
+        if fix and fixes:
+            await stats.bulk_write(fixes, ordered=False)
+        if fix:
+            for user_id in missing:
+                await seed_user_order_stats(db, user_id, ObjectId())
+
+    return {"checked": checked, "mismatched": mismatched, "fixed": fix, "details": details}
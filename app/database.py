@@ -1,5 +1,11 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from pymongo.errors import OperationFailure
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 
 class Settings(BaseSettings):
     # Removing the default "localhost" forces Pydantic to find the Railway variable
@@ -7,8 +13,123 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = "epet_db"
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10  # Concurrent refreshes from two tabs aren't treated as theft
+    REVOCATION_SYNC_SECONDS: float = 1.0
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 300
     FRONTEND_URL: str = "http://localhost:5173"
+    JWT_CACHE_SIZE: int = 10000  # Verified tokens kept in memory per worker; 0 disables
+    JWT_BACKEND: str = "jose"  # jose, native (HS* only) or pyjwt (if installed)
+
+    # MongoDB connection pool and driver tuning
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 20000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    MONGO_COMPRESSORS: str = "zstd,snappy,zlib"  # Comma-separated, in order of preference
+    MONGO_ZLIB_COMPRESSION_LEVEL: int = 6
+    MONGO_RETRY_READS: bool = True
+    MONGO_RETRY_WRITES: bool = True
+    MONGO_APP_NAME: str = "pawstore-backend"
+    MONGO_WARMUP_ON_STARTUP: bool = True
+
+    # Read routing: catalog reads may go to secondaries, cart/order flows stay on the primary
+    CATALOG_READ_PREFERENCE: str = "secondaryPreferred"
+    CATALOG_MAX_STALENESS_SECONDS: int = 90  # -1 disables; MongoDB requires at least 90
+    CAUSAL_CONSISTENCY: bool = True
+
+    # Rate limiting for login/register/forgot-password ("memory" per worker, "mongo" shared)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_LOGIN_PER_IP_PER_MINUTE: int = 20
+    RATE_LIMIT_LOGIN_PER_ACCOUNT_PER_MINUTE: int = 5
+    RATE_LIMIT_REGISTER_PER_IP_PER_HOUR: int = 10
+    RATE_LIMIT_FORGOT_PASSWORD_PER_HOUR: int = 5
+
+    # Response compression (gzip, plus brotli when installed)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies aren't worth the CPU
+    COMPRESSION_OFFLOAD_SIZE: int = 262144  # Bytes; larger bodies compress in a worker thread
+
+    # Change-stream event bus (needs a replica set; disabled automatically on standalone)
+    CHANGE_STREAMS_ENABLED: bool = True
+    LOW_STOCK_THRESHOLD: int = 10
+
+    # Server-Sent Events for live order status
+    SSE_HEARTBEAT_SECONDS: int = 15
+    SSE_RETRY_MS: int = 5000
+    SSE_QUEUE_SIZE: int = 16
+    SSE_MAX_CONNECTIONS_PER_USER: int = 5
+    SSE_MAX_CONNECTIONS: int = 1000  # Per worker process
+
+    # Idempotency-Key support for retried POSTs
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    # A first request still in_progress after this long is presumed dead; a retry takes over
+    IDEMPOTENCY_LEASE_SECONDS: int = 60
+
+    # Bulk inventory import
+    INVENTORY_IMPORT_BATCH_SIZE: int = 1000
+    INVENTORY_IMPORT_MAX_ERRORS: int = 1000
+
+    # "Frequently bought together" recommendations
+    RECOMMENDATIONS_ENABLED: bool = True
+    RECOMMENDATIONS_REFRESH_SECONDS: int = 60
+    RECOMMENDATIONS_TOP_K: int = 20
+    RECOMMENDATIONS_MIN_SUPPORT: int = 2  # Pairs bought together fewer times are noise
+    RECOMMENDATIONS_MAX_BASKET_SIZE: int = 50
+
+    # Pet-profile personalized feed (/inventory/for-me)
+    FEED_CANDIDATES_PER_LIST: int = 500
+    FEED_REFRESH_SECONDS: int = 300
+    FEED_REBUILD_DEBOUNCE_SECONDS: int = 5
+
+    # Trending / best-seller rankings
+    TRENDING_HALF_LIFE_HOURS: float = 72.0
+    TRENDING_EPOCH: datetime = datetime(2025, 1, 1)  # Move forward (then rebuild) every few years
+
+    # Liveness / readiness probes
+    READINESS_PING_TIMEOUT_SECONDS: float = 1.0
+    READINESS_MAX_LOOP_LAG_MS: float = 250.0
+    LOOP_LAG_SAMPLE_SECONDS: float = 0.5
+
+    # Guest cart / wishlist retention
+    GUEST_CART_RETENTION_DAYS: int = 30
+    GUEST_WISHLIST_RETENTION_DAYS: int = 30
+    GUEST_SWEEP_INTERVAL_SECONDS: int = 3600
+    GUEST_SWEEP_BATCH_SIZE: int = 1000
+
+    # Fan-out of user fields copied into other collections
+    DENORMALIZATION_BATCH_SIZE: int = 500
+    DENORMALIZATION_POLL_SECONDS: int = 10
+    DENORMALIZATION_LEASE_SECONDS: int = 60
+    DENORMALIZATION_MAX_ATTEMPTS: int = 5
+    DENORMALIZATION_JOB_RETENTION_DAYS: int = 7
+
+    # Cleanup of records referencing deleted users / inventory items
+    CASCADE_BATCH_SIZE: int = 500
+    CASCADE_BATCH_PAUSE_SECONDS: float = 0.05
+    CASCADE_POLL_SECONDS: int = 10
+    CASCADE_LEASE_SECONDS: int = 60
+    CASCADE_MAX_ATTEMPTS: int = 5
+    CASCADE_JOB_RETENTION_DAYS: int = 7
+
+    # Admin dashboard
+    ADMIN_RECENT_ORDERS_LIMIT: int = 10
+    ADMIN_RECENT_ORDERS_MAX_LIMIT: int = 100
+
+    # Production server (serve.py)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int = 0  # Worker processes; 0 = one per CPU core
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_BACKLOG: int = 2048
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
 
     # Modern Pydantic v2 configuration
     model_config = SettingsConfigDict(
@@ -22,39 +143,228 @@ settings = Settings()
 class Database:
     def __init__(self):
         self.client = None
+        self.catalog = None
+        self.pool_warmed = False
+        self.indexes_ready = False
     
 
 db = Database()
 
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def build_read_preference(mode: str, max_staleness_seconds: int = -1):
+    """Turn a read preference name from settings into a pymongo read preference"""
+    mode_class = READ_PREFERENCE_MODES.get(mode.replace("_", "").lower())
+    if mode_class is None:
+        raise ValueError(f"Unknown read preference: {mode}")
+    if mode_class is Primary:
+        return Primary()
+    if max_staleness_seconds != -1:
+        max_staleness_seconds = max(max_staleness_seconds, 90)
+    return mode_class(max_staleness=max_staleness_seconds)
+
 
 async def get_database():
+    """Primary-routed database, used for writes and read-your-writes flows"""
     return db.client[settings.DATABASE_NAME]
 
 
-async def connect_to_mongo():
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
-    print(f"Connected to MongoDB at {settings.MONGODB_URL}")
+async def get_catalog_database():
+    """Database routed by CATALOG_READ_PREFERENCE, for catalog reads that tolerate staleness"""
+    if db.catalog is None:
+        db.catalog = db.client.get_database(
+            settings.DATABASE_NAME,
+            read_preference=build_read_preference(
+                settings.CATALOG_READ_PREFERENCE, settings.CATALOG_MAX_STALENESS_SECONDS
+            ),
+        )
+    return db.catalog
+
+
+@asynccontextmanager
+async def causal_session():
+    """Causally consistent session so reads in a request observe that request's writes"""
+    async with await db.client.start_session(causal_consistency=settings.CAUSAL_CONSISTENCY) as session:
+        yield session
+
+
+def redact_mongo_url(url: str) -> str:
+    """Strip credentials from a MongoDB URL so it is safe to log"""
+    parts = urlsplit(url)
+    if "@" not in parts.netloc:
+        return url
+    hosts = parts.netloc.rsplit("@", 1)[1]
+    return urlunsplit((parts.scheme, f"***:***@{hosts}", parts.path, parts.query, parts.fragment))
+
+
+def available_compressors(requested: str) -> list:
+    """Keep only the wire compressors whose Python modules are installed"""
+    modules = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+    compressors = []
+    for name in [c.strip().lower() for c in requested.split(",") if c.strip()]:
+        module = modules.get(name)
+        if module is None:
+            continue
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        compressors.append(name)
+    return compressors
+
+
+def mongo_client_options() -> dict:
+    """Build AsyncIOMotorClient keyword arguments from settings"""
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": min(settings.MONGO_MIN_POOL_SIZE, settings.MONGO_MAX_POOL_SIZE),
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "retryReads": settings.MONGO_RETRY_READS,
+        "retryWrites": settings.MONGO_RETRY_WRITES,
+        "appname": settings.MONGO_APP_NAME,
+    }
+    compressors = available_compressors(settings.MONGO_COMPRESSORS)
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+        if "zlib" in compressors:
+            options["zlibCompressionLevel"] = settings.MONGO_ZLIB_COMPRESSION_LEVEL
+    return options
+
+
+async def warm_up_pool(client, connections: int):
+    """Open `connections` pooled sockets up front so the first requests don't pay the handshake"""
+    if connections <= 0:
+        return
+    await asyncio.gather(*[client.admin.command("ping") for _ in range(connections)])
+
+
+# (collection, keys, options) created at startup; create_index is a no-op when the index exists
+INDEXES = [
+    ("orders", [("order_time", -1), ("_id", -1)], {}),
+    ("orders", [("user_id", 1)], {}),
+    ("orders", [("user_id", 1), ("order_time", -1)], {}),
+    # Admin user directory prefix search
+    ("users", [("username", 1)], {}),
+    ("users", [("email", 1)], {}),
+    ("users", [("full_name", 1)], {}),
+    ("order_items", [("order_id", 1)], {}),
+    ("user_pet_profiles", [("user_id", 1)], {}),
+    ("refresh_tokens", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("refresh_tokens", [("user_id", 1)], {}),
+    ("refresh_tokens", [("session_id", 1)], {}),
+    ("token_revocations", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("reviews", [("inventory_id", 1), ("user_id", 1)], {"unique": True}),  # One review per user per item
+    ("reviews", [("inventory_id", 1), ("_id", -1)], {}),
+    ("reviews", [("user_id", 1)], {}),
+    ("denormalization_jobs", [("status", 1), ("_id", 1)], {}),
+    ("denormalization_jobs", [("user_id", 1), ("_id", -1)], {}),
+    # finished_at is null until a job is done, so only finished jobs expire
+    ("denormalization_jobs", [("finished_at", 1)], {"expireAfterSeconds": settings.DENORMALIZATION_JOB_RETENTION_DAYS * 86400}),
+    ("sales_rankings", [("kind", 1), ("trend", -1)], {}),
+    ("sales_rankings", [("kind", 1), ("units", -1)], {}),
+    ("sales_rankings", [("kind", 1), ("category_id", 1), ("trend", -1)], {}),
+    ("sales_rankings", [("kind", 1), ("category_id", 1), ("units", -1)], {}),
+    ("sales_rankings", [("kind", 1), ("subcategory_id", 1), ("trend", -1)], {}),
+    ("sales_rankings", [("kind", 1), ("subcategory_id", 1), ("units", -1)], {}),
+    ("idempotency_keys", [("created_at", 1)], {"expireAfterSeconds": settings.IDEMPOTENCY_TTL_SECONDS}),
+    ("cart_items", [("cart_id", 1)], {}),
+    # Bulk import upserts match on sku or name
+    ("inventory", [("sku", 1)], {"unique": True, "partialFilterExpression": {"sku": {"$type": "string"}}}),
+    ("inventory", [("name", 1)], {}),
+    # Guest carts and wishlists expire after a period without updates; user carts have no guest_id
+    ("carts", [("guest_id", 1)], {}),
+    ("carts", [("updated_at", 1)], {
+        "expireAfterSeconds": settings.GUEST_CART_RETENTION_DAYS * 86400,
+        "partialFilterExpression": {"guest_id": {"$type": "string"}},
+    }),
+    ("guest_wishlists", [("guest_id", 1)], {}),
+    ("guest_wishlists", [("updated_at", 1)], {"expireAfterSeconds": settings.GUEST_WISHLIST_RETENTION_DAYS * 86400}),
+    # Cascading cleanup finds dependents of a deleted user or item by these
+    ("carts", [("user_id", 1)], {}),
+    ("cart_items", [("inventory_id", 1)], {}),
+    ("wishlist", [("user_id", 1)], {}),
+    ("wishlist", [("inventory_id", 1)], {}),
+    ("guest_wishlists", [("items", 1)], {}),
+    ("guest_wishlists", [("items.inventory_id", 1)], {}),
+    ("cascade_jobs", [("status", 1), ("_id", 1)], {}),
+    ("cascade_jobs", [("finished_at", 1)], {"expireAfterSeconds": settings.CASCADE_JOB_RETENTION_DAYS * 86400}),
+]
+
+
+async def ensure_indexes():
+    database = await get_database()
+    for collection, keys, options in INDEXES:
+        try:
+            await database[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            # IndexOptionsConflict: a changed TTL retention is applied in place with collMod
+            if e.code != 85 or "expireAfterSeconds" not in options:
+                raise
+            await database.command("collMod", collection, index={
+                "keyPattern": dict(keys), "expireAfterSeconds": options["expireAfterSeconds"]
+            })
+
+
+async def connect_to_mongo(prepare: bool = True):
+    """Create the client; with prepare=False the caller runs prepare_database() itself"""
+    options = mongo_client_options()
+    db.client = AsyncIOMotorClient(settings.MONGODB_URL, **options)
+    db.catalog = None
+    db.pool_warmed = False
+    db.indexes_ready = False
+    print(
+        f"Connected to MongoDB at {redact_mongo_url(settings.MONGODB_URL)} "
+        f"(pool {options['minPoolSize']}-{options['maxPoolSize']}, "
+        f"compressors: {options.get('compressors', 'none')})"
+    )
+    if prepare:
+        await prepare_database()
+
+
+async def prepare_database():
+    """Pre-connect the pool and ensure indexes; failures are printed, not raised"""
+    if settings.MONGO_WARMUP_ON_STARTUP:
+        try:
+            await warm_up_pool(db.client, min(settings.MONGO_MIN_POOL_SIZE, settings.MONGO_MAX_POOL_SIZE))
+            db.pool_warmed = True
+        except Exception as e:
+            # Don't block startup; the driver will keep retrying in the background
+            print(f"MongoDB pool warm-up failed: {e}")
+    try:
+        await ensure_indexes()
+        db.indexes_ready = True
+    except Exception as e:
+        print(f"MongoDB index creation failed: {e}")
 
 
 async def close_mongo_connection():
     if db.client:
         db.client.close()
+        db.catalog = None
         print("Closed connection to MongoDB")
 
 
 async def get_user_order_summary(user_id: str):
-    """Get total orders and total spent for a user"""
+    """Get total orders, total spent and last order time for a user (cancelled orders excluded)"""
+    from app.customer_stats import get_user_order_stats
     database = await get_database()
     
-    # Get total number of orders
-    total_orders = await database.orders.count_documents({"user_id": user_id})
-    
-    # Get total amount spent by aggregating all orders
-    pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$group": {"_id": None, "total_spent": {"$sum": "$total"}}}
-    ]
-    result = await database.orders.aggregate(pipeline).to_list(1)
-    total_spent = result[0]["total_spent"] if result else 0.0
+    # Running counters maintained by order writes; one small document read
+    stats = await get_user_order_stats(database, user_id)
     
-    return {"total_orders": total_orders, "total_spent": total_spent}
+    return {
+        "total_orders": stats.get("order_count", 0),
+        "total_spent": round(stats.get("total_spent", 0.0), 2),
+        "last_order_time": stats.get("last_order_time")
+    }
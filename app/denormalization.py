@@ -0,0 +1,75 @@
+import asyncio
+from typing import Optional
+from bson import ObjectId
+from app.database import settings
+from app.jobs import JobQueue
+
+JOBS_COLLECTION = "denormalization_jobs"
+
+# (collection, field holding the user id, {copied field: users field}).
+# Listing endpoints read the copies directly; these keep them in sync.
+DENORMALIZED_USER_FIELDS = [
+    ("user_pet_profiles", "user_id", {"username": "username"}),
+    ("reviews", "user_id", {"username": "username"}),
+    ("orders", "user_id", {"customer_name": "full_name", "customer_email": "email"}),
+]
+
+SOURCE_FIELDS = {field for _, _, copies in DENORMALIZED_USER_FIELDS for field in copies.values()}
+
+
+def targets_for(changed_fields) -> list:
+    changed = set(changed_fields)
+    return [collection for collection, _, copies in DENORMALIZED_USER_FIELDS if changed & set(copies.values())]
+
+
+async def enqueue_user_fanout(db, user_id: str, changed_fields) -> Optional[str]:
+    """Queue propagation of a user's changed fields to every collection that copies them"""
+    targets = targets_for(changed_fields)
+    if not targets:
+        return None
+    return await fanout_jobs.enqueue(db, {
+        "user_id": user_id,
+        "fields": sorted(set(changed_fields) & SOURCE_FIELDS),
+        "progress": {collection: {"updated": 0, "done": False} for collection in targets},
+    })
+
+
+async def process_job(db, job: dict, pause_seconds: float = 0.02):
+    """
+    Rewrite stale copies in batches. The values come from the users document
+    as it is now, not as it was when the job was queued, so jobs for the same
+    user can run in any order. Only documents that still differ are touched,
+    which makes a resumed job pick up where the last attempt stopped.
+    """
+    batch_size = settings.DENORMALIZATION_BATCH_SIZE
+    user_id = job["user_id"]
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {field: 1 for field in SOURCE_FIELDS})
+    if user is None:
+        return  # A deleted user leaves nothing to propagate
+
+    for collection, user_field, copies in DENORMALIZED_USER_FIELDS:
+        progress = job["progress"].get(collection)
+        if progress is None or progress["done"]:
+            continue
+        values = {copy: user.get(source) for copy, source in copies.items()}
+        query = {user_field: user_id, "$or": [{copy: {"$ne": value}} for copy, value in values.items()]}
+
+        while True:
+            stale = await db[collection].find(query, {"_id": 1}).limit(batch_size).to_list(batch_size)
+            if not stale:
+                break
+            result = await db[collection].update_many(
+                {"_id": {"$in": [doc["_id"] for doc in stale]}}, {"$set": values}
+            )
+            await fanout_jobs.progress(db, job["_id"], inc={f"progress.{collection}.updated": result.modified_count})
+            await asyncio.sleep(pause_seconds)
+
+        await fanout_jobs.progress(db, job["_id"], set_fields={f"progress.{collection}.done": True})
+
+
+fanout_jobs = JobQueue(
+    JOBS_COLLECTION, process_job,
+    poll_seconds=settings.DENORMALIZATION_POLL_SECONDS,
+    lease_seconds=settings.DENORMALIZATION_LEASE_SECONDS,
+    max_attempts=settings.DENORMALIZATION_MAX_ATTEMPTS
+)
@@ -0,0 +1,313 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+from pymongo.errors import OperationFailure, PyMongoError
+from app.database import settings, get_database
+
+logger = logging.getLogger(__name__)
+
+
+# ============= EVENTS =============
+
+class ChangeEvent(BaseModel):
+    collection: str
+    operation: str  # insert, update, replace, delete
+    document_id: str
+    document: Optional[dict] = None  # Full document after the change (None for deletes)
+    updated_fields: Optional[dict] = None
+    removed_fields: Optional[list] = None
+    cluster_time: Optional[datetime] = None
+
+
+class InventoryChanged(ChangeEvent):
+    pass
+
+
+class OrderChanged(ChangeEvent):
+    pass
+
+
+class CategoryChanged(ChangeEvent):
+    pass
+
+
+EVENT_TYPES = {
+    "inventory": InventoryChanged,
+    "orders": OrderChanged,
+    "categories": CategoryChanged,
+}
+
+
+def event_from_change(change: dict) -> Optional[ChangeEvent]:
+    """Convert a raw change-stream document into a typed event"""
+    collection = change.get("ns", {}).get("coll")
+    event_type = EVENT_TYPES.get(collection)
+    if event_type is None or "documentKey" not in change:
+        return None
+
+    description = change.get("updateDescription") or {}
+    document = change.get("fullDocument")
+    if document is not None:
+        document = dict(document)
+        document["_id"] = str(document["_id"])
+
+    cluster_time = change.get("clusterTime")
+    return event_type(
+        collection=collection,
+        operation=change["operationType"],
+        document_id=str(change["documentKey"]["_id"]),
+        document=document,
+        updated_fields=description.get("updatedFields"),
+        removed_fields=description.get("removedFields"),
+        cluster_time=cluster_time.as_datetime().replace(tzinfo=None) if cluster_time else None
+    )
+
+
+# ============= BUS =============
+
+class EventBus:
+    """In-process pub/sub; handlers subscribe to an event class (or ChangeEvent for all)"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def subscribe(self, event_type, handler):
+        self.handlers.setdefault(event_type, []).append(handler)
+
+    async def publish(self, event: ChangeEvent):
+        for event_type, handlers in self.handlers.items():
+            if not isinstance(event, event_type):
+                continue
+            for handler in handlers:
+                try:
+                    await handler(event)
+                except Exception:
+                    logger.exception(f"Event handler {handler} failed for {event.collection} {event.document_id}")
+
+
+event_bus = EventBus()
+
+
+# ============= SOURCES =============
+
+class ChangeStreamConsumer:
+    """
+    Tails a MongoDB change stream (replica set or sharded cluster required)
+    and publishes typed events. The resume token is persisted so a restarted
+    consumer continues where it left off instead of missing changes.
+    """
+
+    def __init__(self, bus: EventBus, name: str = "app", token_flush_seconds: float = 1.0):
+        self.bus = bus
+        self.name = name
+        self.token_flush_seconds = token_flush_seconds
+        self.task = None
+        self.running = False
+        self.opened = asyncio.Event()
+        # async (db) callables run each time the stream (re)opens, e.g. to load snapshots
+        self.on_open = []
+
+    @property
+    def live(self) -> bool:
+        """True while a change stream is open and events are flowing"""
+        return self.running and self.opened.is_set()
+
+    async def load_resume_token(self, db):
+        saved = await db.change_stream_tokens.find_one({"_id": self.name})
+        return saved["token"] if saved else None
+
+    async def save_resume_token(self, db, token):
+        await db.change_stream_tokens.update_one(
+            {"_id": self.name},
+            {"$set": {"token": token, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def run(self):
+        db = await get_database()
+        pipeline = [{"$match": {"ns.coll": {"$in": list(EVENT_TYPES)}}}]
+        backoff = 1.0
+
+        while self.running:
+            resume_token = await self.load_resume_token(db)
+            try:
+                async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                    self.opened.set()
+                    backoff = 1.0
+                    await self.run_open_callbacks(db)
+                    last_flush = asyncio.get_running_loop().time()
+                    pending_token = None
+                    while self.running:
+                        change = await stream.try_next()
+                        if change is not None:
+                            event = event_from_change(change)
+                            if event is not None:
+                                await self.bus.publish(event)
+                            pending_token = stream.resume_token
+                        elif stream.resume_token is not None:
+                            pending_token = stream.resume_token
+
+                        now = asyncio.get_running_loop().time()
+                        if pending_token is not None and now - last_flush >= self.token_flush_seconds:
+                            await self.save_resume_token(db, pending_token)
+                            pending_token = None
+                            last_flush = now
+                        if change is None:
+                            await asyncio.sleep(0.1)
+            except OperationFailure as e:
+                if e.code == 40573:  # Change streams are only supported on replica sets
+                    logger.warning("Change streams unavailable (standalone mongod); event consumer disabled")
+                    self.running = False
+                    self.opened.clear()
+                    return
+                if e.code == 286:  # ChangeStreamHistoryLost: token fell off the oplog
+                    logger.warning("Change stream resume token expired; restarting from now")
+                    await db.change_stream_tokens.delete_one({"_id": self.name})
+                    continue
+                logger.error(f"Change stream failed: {e}")
+            except PyMongoError as e:
+                logger.error(f"Change stream error: {e}")
+            except asyncio.CancelledError:
+                self.opened.clear()
+                raise
+
+            self.opened.clear()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def run_open_callbacks(self, db):
+        """
+        Changes from here on reach subscribers, so a snapshot loaded now
+        misses nothing. Reloading after a reconnect also covers changes made
+        while the stream was down.
+        """
+        for callback in self.on_open:
+            try:
+                await callback(db)
+            except PyMongoError as e:
+                logger.error(f"Change stream open callback failed: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.running = True
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.running = False
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.task = None
+
+
+class InMemoryChangeSource:
+    """
+    Drop-in replacement for ChangeStreamConsumer when no replica set is
+    available (tests, local dev). Raw change documents pushed with push() are
+    converted and published exactly as the change stream would.
+    """
+
+    def __init__(self, bus: EventBus):
+        self.bus = bus
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.on_open = []  # async (db) -> None, run once before the first change
+
+    def push(self, change: dict):
+        self.queue.put_nowait(change)
+
+    async def run(self):
+        await self.run_open_callbacks(await get_database())
+        while True:
+            change = await self.queue.get()
+            event = event_from_change(change)
+            if event is not None:
+                await self.bus.publish(event)
+            self.queue.task_done()
+
+    async def drain(self):
+        """Wait until every pushed change has been published"""
+        await self.queue.join()
+
+    async def run_open_callbacks(self, db):
+        """Load snapshots before the first pushed change is published"""
+        for callback in self.on_open:
+            try:
+                await callback(db)
+            except PyMongoError as e:
+                logger.error(f"Change source open callback failed: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+# ============= SUBSCRIBERS =============
+
+class LowStockMonitor:
+    """Keeps the set of low-stock inventory items current from inventory events"""
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.items = {}  # inventory_id -> {"name", "stock"}
+        self.ready = False
+
+    async def load(self, db):
+        cursor = db.inventory.find({"stock": {"$lt": self.threshold}}, {"name": 1, "stock": 1})
+        self.items = {str(item["_id"]): {"name": item.get("name", "Unknown"), "stock": item.get("stock", 0)}
+                      async for item in cursor}
+        self.ready = True
+
+    async def handle(self, event: InventoryChanged):
+        if event.operation == "delete" or event.document is None:
+            self.items.pop(event.document_id, None)
+            return
+        stock = event.document.get("stock", 0)
+        if stock < self.threshold:
+            self.items[event.document_id] = {"name": event.document.get("name", "Unknown"), "stock": stock}
+        else:
+            self.items.pop(event.document_id, None)
+
+    def snapshot(self):
+        return sorted(
+            ({"id": item_id, **item} for item_id, item in self.items.items()),
+            key=lambda item: item["stock"]
+        )
+
+
+low_stock_monitor = LowStockMonitor(settings.LOW_STOCK_THRESHOLD)
+event_bus.subscribe(InventoryChanged, low_stock_monitor.handle)
+
+change_consumer = ChangeStreamConsumer(event_bus)
+change_consumer.on_open.append(low_stock_monitor.load)
+
+
+async def start_event_consumers():
+    if not settings.CHANGE_STREAMS_ENABLED:
+        return
+    change_consumer.start()
+    # Snapshots load from the consumer once the stream is open, however long that
+    # takes; give it a moment here so the first requests usually find them ready.
+    # On a standalone mongod the consumer task exits immediately instead.
+    opened = asyncio.create_task(change_consumer.opened.wait())
+    await asyncio.wait([opened, change_consumer.task], timeout=5, return_when=asyncio.FIRST_COMPLETED)
+    if not opened.done():
+        opened.cancel()
+
+
+async def stop_event_consumers():
+    await change_consumer.stop()
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from app.database import db, settings, get_database, get_catalog_database, prepare_database
+from app.auth import token_cache
+from app.events import change_consumer, low_stock_monitor
+from app.personalization import personalized_feed
+from app.recommendations import recommender
+from app.sessions import user_cache, revocation_filter
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late a periodic sleep wakes up: a direct reading of how long
+    requests wait behind blocking code on this worker's event loop.
+    """
+
+    def __init__(self, interval: float, window: int = 60):
+        self.interval = interval
+        self.samples = deque(maxlen=window)  # lag in ms, most recent last
+
+    @property
+    def lag_ms(self) -> float:
+        return self.samples[-1] if self.samples else 0.0
+
+    @property
+    def max_lag_ms(self) -> float:
+        return max(self.samples, default=0.0)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, (loop.time() - expected) * 1000))
+
+
+loop_lag_monitor = LoopLagMonitor(settings.LOOP_LAG_SAMPLE_SECONDS)
+
+startup_state = {
+    "started_at": datetime.utcnow(),
+    "warm_up_completed_at": None,
+    "warm_up_seconds": None,
+}
+
+
+async def startup_warm_up():
+    """
+    Pre-connect the pool, ensure indexes and prime the caches requests rely
+    on. Readiness stays false until this finishes, so a new worker only takes
+    traffic once it is fast. Each step logs and continues on failure.
+    """
+    started = time.perf_counter()
+    await prepare_database()
+
+    try:
+        await revocation_filter.sync(await get_database())
+    except Exception as e:
+        logger.error(f"Warm-up: revocation sync failed: {e}")
+    try:
+        catalog = await get_catalog_database()
+        # Opens connections to the catalog read preference's members too
+        await catalog.categories.find().to_list(1000)
+        await personalized_feed.rebuild(catalog)
+    except Exception as e:
+        logger.error(f"Warm-up: catalog priming failed: {e}")
+
+    startup_state["warm_up_completed_at"] = datetime.utcnow()
+    startup_state["warm_up_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Warm-up completed in {startup_state['warm_up_seconds']}s")
+
+
+async def ping_mongo() -> dict:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.client.admin.command("ping"), timeout=settings.READINESS_PING_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"ping timed out after {settings.READINESS_PING_TIMEOUT_SECONDS}s"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+async def check_readiness() -> dict:
+    """Ready = warm-up done, Mongo answers a ping in time and the event loop isn't stalled"""
+    mongo = await ping_mongo()
+    warmed_up = startup_state["warm_up_completed_at"] is not None
+    loop_ok = loop_lag_monitor.lag_ms <= settings.READINESS_MAX_LOOP_LAG_MS
+
+    return {
+        "ready": warmed_up and mongo["ok"] and loop_ok,
+        "checks": {
+            "warm_up": {"ok": warmed_up, **startup_state},
+            "mongo": mongo,
+            "event_loop": {
+                "ok": loop_ok,
+                "lag_ms": round(loop_lag_monitor.lag_ms, 2),
+                "max_lag_ms": round(loop_lag_monitor.max_lag_ms, 2),
+                "threshold_ms": settings.READINESS_MAX_LOOP_LAG_MS,
+            },
+        },
+        "pool": {
+            "min_size": settings.MONGO_MIN_POOL_SIZE,
+            "max_size": settings.MONGO_MAX_POOL_SIZE,
+            "warmed": db.pool_warmed,
+            "indexes_ready": db.indexes_ready,
+        },
+        "caches": {
+            "jwt": {"size": len(token_cache.entries), "hits": token_cache.hits, "misses": token_cache.misses},
+            "users": {"size": len(user_cache.entries)},
+            "revocations": {
+                "sessions": len(revocation_filter.sessions),
+                "users": len(revocation_filter.users),
+                "synced_at": revocation_filter.synced_at,
+            },
+            "personalized_feed": {"items": len(personalized_feed.items), "built_at": personalized_feed.built_at},
+            "recommendations": recommender.stats(),
+            "low_stock": {"ready": low_stock_monitor.ready, "items": len(low_stock_monitor.items)},
+            "change_stream_live": change_consumer.live,
+        },
+    }
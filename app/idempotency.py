@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+import orjson
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+from app.database import settings, get_database
+from app.serialization import FastJSONResponse
+
+# Keys whose first request is still running in this process -> future of the stored record
+_in_flight = {}
+
+
+def fingerprint(payload) -> str:
+    return hashlib.sha256(orjson.dumps(jsonable_encoder(payload), option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def replay(record: dict) -> FastJSONResponse:
+    response = FastJSONResponse(record["body"], status_code=record["status_code"])
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+async def wait_for_completion(collection, record_id: str) -> Optional[dict]:
+    """Wait for a duplicate's first request, locally via its future or by polling Mongo"""
+    future = _in_flight.get(record_id)
+    if future is not None:
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=settings.IDEMPOTENCY_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            return None
+
+    deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+    while asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(delay)
+        record = await collection.find_one({"_id": record_id})
+        if record is None or record["state"] == "completed":
+            return record
+        delay = min(delay * 2, 0.5)
+    return None
+
+
+async def take_over(collection, record_id: str, attempt: str) -> bool:
+    """
+    Claim an in_progress record whose lease ran out: the request holding it
+    died (worker crash, deploy) without completing or releasing the key.
+    Records written before leases existed expire IDEMPOTENCY_LEASE_SECONDS
+    after created_at.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+    result = await collection.update_one(
+        {"_id": record_id, "state": "in_progress", "$or": [
+            {"lease_expires_at": {"$lt": now}},
+            {"lease_expires_at": {"$exists": False}, "created_at": {"$lt": stale}},
+        ]},
+        {"$set": {"attempt": attempt, "lease_expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)}}
+    )
+    return result.modified_count == 1
+
+
+async def idempotent(
+    key: Optional[str],
+    scope: str,
+    owner: str,
+    payload,
+    handler: Callable[[], Awaitable],
+    status_code: int = 200
+):
+    """
+    Run `handler` at most once per (scope, owner, Idempotency-Key).
+
+    The first request stores its response; retries with the same key and
+    payload get that response replayed, and concurrent duplicates wait for the
+    first one to finish. Failed requests (exceptions) are not stored, so the
+    client can retry them. A first request that neither finishes nor fails
+    within IDEMPOTENCY_LEASE_SECONDS (its worker died) is taken over by the
+    next retry instead of blocking the key until the record expires.
+    """
+    if not key:
+        return await handler()
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+
+    db = await get_database()
+    collection = db.idempotency_keys
+    record_id = f"{scope}:{owner}:{key}"
+    request_hash = fingerprint(payload)
+
+    attempt = uuid.uuid4().hex
+    now = datetime.utcnow()
+    try:
+        await collection.insert_one({
+            "_id": record_id,
+            "state": "in_progress",
+            "request_hash": request_hash,
+            "attempt": attempt,
+            "lease_expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS),
+            "created_at": now
+        })
+    except DuplicateKeyError:
+        record = await collection.find_one({"_id": record_id})
+        if record is None:
+            # The first attempt failed and released the key; run this one normally
+            return await idempotent(key, scope, owner, payload, handler, status_code)
+        if record["request_hash"] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if record["state"] == "in_progress" and not await take_over(collection, record_id, attempt):
+            record = await wait_for_completion(collection, record_id)
+            if record is None:
+                if await collection.find_one({"_id": record_id}) is None:
+                    return await idempotent(key, scope, owner, payload, handler, status_code)
+                if not await take_over(collection, record_id, attempt):
+                    raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+                record = {"state": "in_progress"}
+        if record["state"] == "completed":
+            return replay(record)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[record_id] = future
+    # Writes are conditional on `attempt` so a request whose lease was taken over
+    # cannot overwrite or release the record of the one that took over
+    owned = {"_id": record_id, "attempt": attempt}
+    try:
+        result = await handler()
+        body = orjson.dumps(jsonable_encoder(result))
+        record = {"state": "completed", "status_code": status_code, "body": body}
+        await collection.update_one(owned, {"$set": record})
+        future.set_result(record)
+        return FastJSONResponse(body, status_code=status_code)
+    except BaseException:
+        await collection.delete_one(owned)
+        future.set_result(None)  # Waiters see the key released and run their own attempt
+        raise
+    finally:
+        _in_flight.pop(record_id, None)
@@ -0,0 +1,261 @@
+import asyncio
+import codecs
+import csv
+from typing import AsyncIterator, Optional
+import orjson
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.models import InventoryCreate
+from app.reviews import REVIEW_AGGREGATE_FIELDS, EMPTY_REVIEW_AGGREGATES
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_KEYS = ("sku", "name")
+
+# CSV cells holding lists: "a.jpg|b.jpg" or a JSON array
+LIST_FIELDS = {"images"}
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonlines" in content_type or "x-jsonl" in content_type:
+        return "ndjson"
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]):
+    """Decode a byte stream into lines without holding more than one chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def parse_csv_cell(field: str, value: str):
+    value = value.strip()
+    if field in LIST_FIELDS:
+        if value.startswith("["):
+            return orjson.loads(value)
+        return [part.strip() for part in value.split("|") if part.strip()]
+    return value
+
+
+async def iter_csv_rows(lines):
+    """
+    Yield (row_number, data, error) per CSV record. A record continues onto
+    the next line while a quoted field is still open.
+    """
+    header = None
+    record = []
+    quotes = 0
+    row_number = 0
+    async for line in lines:
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text, record, quotes = record, [], 0
+        if not any(part.strip() for part in text):
+            continue
+
+        try:
+            values = next(csv.reader(part + "\n" for part in text))
+        except csv.Error as e:
+            if header is None:
+                yield 0, None, [f"Unreadable header: {e}"]
+                return
+            row_number += 1
+            yield row_number, None, [f"Malformed CSV: {e}"]
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row_number += 1
+        if len(values) > len(header):
+            yield row_number, None, [f"Row has {len(values)} columns, header has {len(header)}"]
+            continue
+        try:
+            data = {
+                field: parse_csv_cell(field, value)
+                for field, value in zip(header, values)
+                if field and value.strip()
+            }
+        except ValueError as e:
+            yield row_number, None, [f"Unreadable list value: {e}"]
+            continue
+        yield row_number, data, None
+
+    if record:
+        yield row_number + 1, None, ["Unterminated quoted field at end of file"]
+
+
+async def iter_ndjson_rows(lines):
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield row_number, None, [f"Invalid JSON: {e}"]
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, ["Each line must be a JSON object"]
+            continue
+        yield row_number, data, None
+
+
+def iter_rows(chunks: AsyncIterator[bytes], file_format: str):
+    lines = iter_lines(chunks)
+    if file_format == "csv":
+        return iter_csv_rows(lines)
+    return iter_ndjson_rows(lines)
+
+
+async def load_category_ids(db):
+    """Category id -> coming_soon, and the set of subcategory ids, for row checks"""
+    categories = {str(category["_id"]): category.get("coming_soon", False)
+                  async for category in db.categories.find({}, {"coming_soon": 1})}
+    subcategories = {str(subcategory["_id"]) async for subcategory in db.subcategories.find({}, {"_id": 1})}
+    return categories, subcategories
+
+
+def validate_row(data: dict, key: str, categories: dict, subcategories: set):
+    """Return (update, errors); the update sets provided fields and inserts defaults for the rest"""
+    try:
+        item = InventoryCreate(**data)
+    except ValidationError as e:
+        return None, [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+
+    errors = []
+    if not getattr(item, key):
+        errors.append(f"{key}: required to match existing items")
+    if item.category_id not in categories:
+        errors.append("category_id: Category not found")
+    elif categories[item.category_id]:
+        errors.append("category_id: Cannot add products to categories marked as 'Coming Soon'")
+    if item.subcategory_id and item.subcategory_id not in subcategories:
+        errors.append("subcategory_id: Subcategory not found")
+    if errors:
+        return None, errors
+
+    # Fields missing from the row only apply to new items, so a feed that
+    # omits e.g. brand does not reset it on existing ones
+    provided = item.dict(exclude_unset=True)
+    defaults = {field: value for field, value in item.dict().items() if field not in provided}
+    # Ratings come from reviews only: new items start empty, existing ones keep theirs
+    for field in REVIEW_AGGREGATE_FIELDS:
+        provided.pop(field, None)
+    defaults.update(EMPTY_REVIEW_AGGREGATES)
+    update = {"$set": provided}
+    if defaults:
+        update["$setOnInsert"] = defaults
+    return UpdateOne({key: provided[key]}, update, upsert=True), None
+
+
+def new_report(max_errors: int) -> dict:
+    return {
+        "rows": 0,
+        "valid": 0,
+        "failed": 0,
+        "upserted": 0,
+        "matched": 0,
+        "modified": 0,
+        "errors": [],
+        "errors_truncated": False,
+        "stopped_at_row": None,
+        "_max_errors": max_errors,
+    }
+
+
+def record_error(report: dict, row_number: int, errors: list):
+    report["failed"] += 1
+    if len(report["errors"]) < report["_max_errors"]:
+        report["errors"].append({"row": row_number, "errors": errors})
+    else:
+        report["errors_truncated"] = True
+
+
+async def write_batch(collection, batch: list, ordered: bool, report: dict) -> bool:
+    """bulk_write one batch of (row_number, operation); False if an ordered import must stop"""
+    try:
+        result = await collection.bulk_write([operation for _, operation in batch], ordered=ordered)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for error in details["writeErrors"]:
+            record_error(report, batch[error["index"]][0], [error["errmsg"]])
+        if ordered and details["writeErrors"]:
+            report["stopped_at_row"] = batch[details["writeErrors"][0]["index"]][0]
+    report["upserted"] += details.get("nUpserted", 0)
+    report["matched"] += details.get("nMatched", 0)
+    report["modified"] += details.get("nModified", 0)
+    return report["stopped_at_row"] is None
+
+
+async def import_inventory(
+    db,
+    rows,
+    key: str = "sku",
+    ordered: bool = False,
+    dry_run: bool = False,
+    batch_size: int = 1000,
+    max_errors: int = 1000
+) -> dict:
+    """
+    Validate streamed rows and upsert them into `inventory` keyed on `key`.
+
+    Rows are written in `batch_size` bulk_write batches; the next batch is
+    parsed and validated while the previous one is being written. Only the
+    current batch and the (capped) error list are held in memory.
+    """
+    report = new_report(max_errors)
+    categories, subcategories = await load_category_ids(db)
+    batch = []
+    pending = None  # bulk_write task for the previous batch
+
+    try:
+        async for row_number, data, errors in rows:
+            report["rows"] += 1
+            operation = None
+            if errors is None:
+                operation, errors = validate_row(data, key, categories, subcategories)
+            if errors:
+                record_error(report, row_number, errors)
+                continue
+            report["valid"] += 1
+            if dry_run:
+                continue
+
+            batch.append((row_number, operation))
+            if len(batch) >= batch_size:
+                if pending is not None and not await pending:
+                    pending = None
+                    break
+                pending = asyncio.create_task(write_batch(db.inventory, batch, ordered, report))
+                batch = []
+        else:
+            if pending is None or await pending:
+                pending = None
+                if batch:
+                    await write_batch(db.inventory, batch, ordered, report)
+    except UnicodeDecodeError:
+        report["stopped_at_row"] = report["rows"] + 1
+        report["errors"].append({"row": report["rows"] + 1, "errors": ["File is not valid UTF-8"]})
+    finally:
+        if pending is not None:
+            await pending
+
+    del report["_max_errors"]
+    return report
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import ReturnDocument
+from app.database import get_database
+from app.maintenance import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Background jobs stored in a Mongo collection so any worker can run them
+    and a restart loses nothing. A worker claims the oldest pending job and
+    keeps a lease on it by touching updated_at as it makes progress; a job
+    whose worker stops (crash, deploy) is claimed again once the lease lapses.
+    Handlers must therefore be safe to re-run from the start. After
+    max_attempts claims a job is marked "failed" with its last error and left
+    for an admin to look at.
+    """
+
+    def __init__(self, collection: str, handler, poll_seconds: float, lease_seconds: float, max_attempts: int):
+        self.collection = collection
+        self.handler = handler  # async (db, job) -> None
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Set by enqueue() so this worker's loop starts without waiting out its poll
+        self.wake: Optional[asyncio.Event] = None
+
+    async def enqueue(self, db, job: dict) -> str:
+        now = datetime.utcnow()
+        result = await db[self.collection].insert_one({
+            **job,
+            "status": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None,
+        })
+        if self.wake is not None:
+            self.wake.set()
+        return str(result.inserted_id)
+
+    async def claim(self, db):
+        """Take the oldest pending job, or a running one whose worker stopped heartbeating"""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.lease_seconds)
+        return await db[self.collection].find_one_and_update(
+            {"$or": [{"status": "pending"}, {"status": "running", "updated_at": {"$lt": stale}}]},
+            {"$set": {"status": "running", "worker": WORKER_ID, "updated_at": now}, "$inc": {"attempts": 1}},
+            sort=[("_id", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def progress(self, db, job_id, inc: dict = None, set_fields: dict = None):
+        """Record progress; also renews the lease"""
+        update = {"$set": {**(set_fields or {}), "updated_at": datetime.utcnow()}}
+        if inc:
+            update["$inc"] = inc
+        await db[self.collection].update_one({"_id": job_id}, update)
+
+    async def finish(self, db, job_id):
+        now = datetime.utcnow()
+        await db[self.collection].update_one(
+            {"_id": job_id}, {"$set": {"status": "done", "updated_at": now, "finished_at": now}}
+        )
+
+    async def fail(self, db, job_id, error: str):
+        # No finished_at, so the retention TTL does not remove failed jobs
+        await db[self.collection].update_one(
+            {"_id": job_id}, {"$set": {"status": "failed", "last_error": error, "updated_at": datetime.utcnow()}}
+        )
+
+    async def run(self):
+        self.wake = asyncio.Event()
+        while True:
+            try:
+                db = await get_database()
+                job = await self.claim(db)
+                while job is not None:
+                    if job["attempts"] > self.max_attempts:
+                        # Every earlier attempt died without recording an outcome
+                        await self.fail(db, job["_id"], job.get("last_error") or "Worker stopped before finishing")
+                        job = await self.claim(db)
+                        continue
+                    try:
+                        await self.handler(db, job)
+                        await self.finish(db, job["_id"])
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Job {job['_id']} in {self.collection} failed (attempt {job['attempts']}): {e}")
+                        if job["attempts"] >= self.max_attempts:
+                            await self.fail(db, job["_id"], str(e))
+                        else:
+                            # Left "running": another attempt resumes it once the lease lapses
+                            await db[self.collection].update_one({"_id": job["_id"]}, {"$set": {"last_error": str(e)}})
+                    job = await self.claim(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job loop for {self.collection} failed: {e}")
+
+            # Polling also picks up jobs queued by other workers
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from app.database import settings, get_database
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Results of the last guest-data sweep in this process, for the admin endpoint
+guest_cleanup_stats = {
+    "last_run_at": None,
+    "orphaned_cart_items_deleted": 0,
+    "bytes_reclaimed": 0,
+    "total_orphaned_cart_items_deleted": 0,
+    "total_bytes_reclaimed": 0,
+    "collections": {},
+}
+
+
+async def acquire_lease(db, name: str, seconds: int) -> bool:
+    """Let only one worker at a time run a periodic job"""
+    now = datetime.utcnow()
+    try:
+        lease = await db.maintenance_leases.find_one_and_update(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"holder": WORKER_ID}]},
+            {"$set": {"holder": WORKER_ID, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Lease exists, is unexpired and held by another worker
+        return False
+    return lease is not None and lease["holder"] == WORKER_ID
+
+
+async def collection_sizes(db, names):
+    sizes = {}
+    for name in names:
+        try:
+            stats = await db.command("collStats", name)
+        except PyMongoError:
+            continue
+        sizes[name] = {
+            "count": stats.get("count", 0),
+            "size_bytes": stats.get("size", 0),
+            "storage_bytes": stats.get("storageSize", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+        }
+    return sizes
+
+
+async def sweep_orphaned_cart_items(db, batch_size: int = 1000, pause_seconds: float = 0.05):
+    """
+    Delete cart_items whose cart no longer exists (guest carts are removed by
+    the TTL index on carts.updated_at). Walks cart_items by _id in batches and
+    pauses between batches to keep the load off the primary.
+    """
+    deleted = 0
+    bytes_reclaimed = 0
+    last_id = None
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        items = await db.cart_items.find(query, {"cart_id": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not items:
+            break
+        last_id = items[-1]["_id"]
+
+        cart_ids = {item.get("cart_id") for item in items if item.get("cart_id")}
+        valid_ids = [ObjectId(cart_id) for cart_id in cart_ids if ObjectId.is_valid(cart_id)]
+        existing = {str(cart["_id"]) async for cart in db.carts.find({"_id": {"$in": valid_ids}}, {"_id": 1})}
+        orphaned = list(cart_ids - existing)
+
+        if orphaned:
+            orphan_filter = {"cart_id": {"$in": orphaned}}
+            sized = await db.cart_items.aggregate([
+                {"$match": orphan_filter},
+                {"$group": {"_id": None, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}}
+            ]).to_list(1)
+            result = await db.cart_items.delete_many(orphan_filter)
+            deleted += result.deleted_count
+            bytes_reclaimed += sized[0]["bytes"] if sized else 0
+
+        await asyncio.sleep(pause_seconds)
+
+    return deleted, bytes_reclaimed
+
+
+async def run_guest_cleanup():
+    db = await get_database()
+    deleted, bytes_reclaimed = await sweep_orphaned_cart_items(db, settings.GUEST_SWEEP_BATCH_SIZE)
+
+    guest_cleanup_stats["last_run_at"] = datetime.utcnow()
+    guest_cleanup_stats["orphaned_cart_items_deleted"] = deleted
+    guest_cleanup_stats["bytes_reclaimed"] = bytes_reclaimed
+    guest_cleanup_stats["total_orphaned_cart_items_deleted"] += deleted
+    guest_cleanup_stats["total_bytes_reclaimed"] += bytes_reclaimed
+    guest_cleanup_stats["collections"] = await collection_sizes(db, ["carts", "cart_items", "guest_wishlists"])
+
+    if deleted:
+        logger.info(f"Guest cleanup removed {deleted} orphaned cart items ({bytes_reclaimed} bytes)")
+    return guest_cleanup_stats
+
+
+async def guest_cleanup_loop():
+    while True:
+        await asyncio.sleep(settings.GUEST_SWEEP_INTERVAL_SECONDS)
+        try:
+            db = await get_database()
+            if await acquire_lease(db, "guest_cleanup", settings.GUEST_SWEEP_INTERVAL_SECONDS):
+                await run_guest_cleanup()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Guest cleanup failed: {e}")
@@ -235,6 +235,7 @@ class SubcategoryResponse(SubcategoryBase):
 # Inventory Models
 class InventoryBase(BaseModel):
     name: str
+    sku: Optional[str] = None
     description: str
     price: float
     stock: int = 0
@@ -259,6 +260,7 @@ class InventoryCreate(InventoryBase):
 
 class InventoryUpdate(BaseModel):
     name: Optional[str] = None
+    sku: Optional[str] = None
     description: Optional[str] = None
     price: Optional[float] = None
     stock: Optional[int] = None
@@ -268,8 +270,6 @@ class InventoryUpdate(BaseModel):
     weight: Optional[str] = None
     brand: Optional[str] = None
     age_range: Optional[str] = None
-    rating: Optional[float] = None
-    num_reviews: Optional[int] = None
     discount: Optional[float] = None
     is_visible: Optional[bool] = None
 
@@ -507,10 +507,47 @@ class WishlistItemResponse(WishlistItemBase):
         populate_by_name = True
 
 
+# Review Models
+class ReviewBase(BaseModel):
+    inventory_id: str
+    user_id: str
+    username: Optional[str] = None
+    rating: int = Field(ge=1, le=5)
+    title: Optional[str] = None
+    comment: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ReviewCreate(BaseModel):
+    rating: int = Field(ge=1, le=5)
+    title: Optional[str] = None
+    comment: Optional[str] = None
+
+
+class ReviewUpdate(BaseModel):
+    rating: Optional[int] = Field(default=None, ge=1, le=5)
+    title: Optional[str] = None
+    comment: Optional[str] = None
+
+
+class ReviewResponse(ReviewBase):
+    id: str = Field(alias="_id")
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
+
 # Token Models
 class Token(BaseModel):
     access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
     token_type: Optional[str] = None
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
     user: Optional[dict] = None
     encrypted_response: Optional[str] = None  # For encrypted responses
 
@@ -535,6 +572,23 @@ class DashboardStats(BaseModel):
     low_stock_items: int
 
 
+class AdminUserSummary(BaseModel):
+    """One row of the admin user directory"""
+    id: str = Field(alias="_id")
+    username: str
+    email: str
+    full_name: str
+    role: str = "user"
+    status: str = "active"
+    register_time: Optional[datetime] = None
+    last_login_time: Optional[datetime] = None
+    total_orders: int = 0
+    total_spent: float = 0.0
+
+    class Config:
+        populate_by_name = True
+
+
 class RecentOrder(BaseModel):
     order_id: str = Field(alias="_id")
     customer_name: str
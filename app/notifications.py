@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+import orjson
+from app.database import settings
+from app.events import event_bus, OrderChanged
+
+
+class OrderStatusBroker:
+    """
+    Fans order status changes out to each user's open SSE connections.
+
+    Every connection gets a small bounded queue; a slow client loses its
+    oldest pending updates rather than growing memory. Idle connections cost
+    one empty queue each.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers = {}  # user_id -> set of asyncio.Queue
+        self.total = 0
+
+    def has_capacity(self, user_id: str, max_per_user: int, max_total: int) -> bool:
+        return self.connection_count(user_id) < max_per_user and self.total < max_total
+
+    def try_subscribe(self, user_id: str, max_per_user: int, max_total: int) -> Optional[asyncio.Queue]:
+        """
+        Check the limits and register in one step. There is no await in
+        between, so concurrent connects cannot all pass the check.
+        """
+        if not self.has_capacity(user_id, max_per_user, max_total):
+            return None
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        self.total += 1
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(user_id)
+        if queues is None:
+            return
+        if queue in queues:
+            queues.discard(queue)
+            self.total -= 1
+        if not queues:
+            del self.subscribers[user_id]
+
+    def connection_count(self, user_id: str = None) -> int:
+        if user_id is not None:
+            return len(self.subscribers.get(user_id, ()))
+        return self.total
+
+    def publish(self, user_id: str, update: dict):
+        for queue in self.subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()  # Drop the oldest update for slow consumers
+            queue.put_nowait(update)
+
+    def publish_status(self, user_id: str, order_id: str, status: str):
+        self.publish(user_id, {
+            "order_id": order_id,
+            "status": status,
+            "updated_at": datetime.utcnow().isoformat()
+        })
+
+    async def handle_order_changed(self, event: OrderChanged):
+        if event.operation != "update" or not event.updated_fields or "status" not in event.updated_fields:
+            return
+        user_id = (event.document or {}).get("user_id")
+        if user_id and user_id in self.subscribers:
+            self.publish_status(user_id, event.document_id, event.updated_fields["status"])
+
+
+order_status_broker = OrderStatusBroker(settings.SSE_QUEUE_SIZE)
+# With change streams every worker sees every status change, whichever worker wrote it
+event_bus.subscribe(OrderChanged, order_status_broker.handle_order_changed)
+
+
+def format_sse(data: dict, event: str = None) -> bytes:
+    message = b""
+    if event:
+        message += f"event: {event}\n".encode()
+    return message + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+async def order_status_stream(request, user_id: str):
+    """SSE body: status updates for the user's orders, with comment heartbeats"""
+    # Registered here rather than in the route so a response that never starts
+    # streaming holds no slot; the route's check only rejects early with a 429
+    queue = order_status_broker.try_subscribe(
+        user_id, settings.SSE_MAX_CONNECTIONS_PER_USER, settings.SSE_MAX_CONNECTIONS
+    )
+    if queue is None:
+        yield format_sse({"detail": "Too many open order streams"}, event="error")
+        return
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n".encode()
+        while True:
+            try:
+                update = await asyncio.wait_for(queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield b": ping\n\n"
+                continue
+            yield format_sse(update, event="order_status")
+    finally:
+        order_status_broker.unsubscribe(user_id, queue)
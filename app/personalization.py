@@ -0,0 +1,174 @@
+import asyncio
+import heapq
+import logging
+import re
+from datetime import datetime
+from typing import Optional
+from app.database import settings, get_catalog_database
+from app.events import event_bus, InventoryChanged, CategoryChanged
+
+logger = logging.getLogger(__name__)
+
+LIFE_STAGES = ("young", "adult", "senior")
+YOUNG_WORDS = ("puppy", "kitten", "junior", "baby", "young", "juvenile")
+SENIOR_WORDS = ("senior", "mature", "geriatric")
+
+# How much an item's age_range moves its score for a pet of a given life stage
+AGE_MATCH = 1.5
+AGE_NEUTRAL = 1.0
+AGE_MISMATCH = 0.5
+
+
+def pet_stem(name: Optional[str]) -> Optional[str]:
+    """'Dogs' -> 'dog', 'fishes' -> 'fish', so pet types and category names compare equal"""
+    if not name:
+        return None
+    word = name.strip().lower()
+    if word.endswith(("shes", "ches", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def category_stems(name: Optional[str]) -> set:
+    return {pet_stem(word) for word in re.findall(r"[a-zA-Z]+", name or "")}
+
+
+def life_stage(value: Optional[str]) -> Optional[str]:
+    """Map a pet's age ('8 months', '3 years') or an item's age_range ('puppy') to a life stage"""
+    if not value:
+        return None
+    text = value.lower()
+    if any(word in text for word in YOUNG_WORDS):
+        return "young"
+    if any(word in text for word in SENIOR_WORDS):
+        return "senior"
+    if "adult" in text:
+        return "adult"
+    number = re.search(r"\d+(\.\d+)?", text)
+    if number is None:
+        return None
+    years = float(number.group())
+    if "month" in text:
+        years /= 12
+    elif "week" in text:
+        years /= 52
+    if years < 1:
+        return "young"
+    return "senior" if years >= 7 else "adult"
+
+
+def popularity(item: dict) -> float:
+    """Rating shrunk toward 3 stars for items with few reviews"""
+    rating = item.get("rating") or 0.0
+    reviews = item.get("num_reviews") or 0
+    return (rating * reviews + 3.0 * 5) / (reviews + 5)
+
+
+class PersonalizedFeed:
+    """
+    Precomputed candidate lists per (pet type, life stage), built from visible
+    in-stock inventory. A request only merges the lists for the user's pets,
+    so no inventory query runs per request. Lists are rebuilt (debounced)
+    when inventory or categories change.
+    """
+
+    def __init__(self, list_size: int):
+        self.list_size = list_size
+        self.items = {}       # inventory_id -> document
+        self.lists = {}       # (pet stem, life stage) -> [(score, inventory_id), ...] best first
+        self.popular = []     # fallback for users without pets
+        self.dirty = True
+        self.built_at = None
+
+    async def mark_dirty(self, event=None):
+        self.dirty = True
+
+    async def handle_inventory_changed(self, event: InventoryChanged):
+        # Orders update stock constantly; that only matters when an item sells out or is restocked
+        if event.operation == "update" and event.updated_fields and set(event.updated_fields) == {"stock"}:
+            in_stock = (event.document or {}).get("stock", 0) > 0
+            if in_stock == (event.document_id in self.items):
+                return
+        self.dirty = True
+
+    async def rebuild(self, db):
+        self.dirty = False
+        stems = {}
+        async for category in db.categories.find({}, {"name": 1}):
+            stems[str(category["_id"])] = category_stems(category.get("name")) - {None}
+
+        items = {}
+        by_stem = {}
+        async for item in db.inventory.find({"is_visible": True, "stock": {"$gt": 0}}):
+            item_id = str(item["_id"])
+            item["_id"] = item_id
+            items[item_id] = item
+            for stem in stems.get(item.get("category_id"), ()):
+                by_stem.setdefault(stem, []).append(item)
+
+        lists = {}
+        for stem, stem_items in by_stem.items():
+            for stage in LIFE_STAGES + (None,):
+                scored = ((self.score(item, stage), item["_id"]) for item in stem_items)
+                lists[(stem, stage)] = heapq.nlargest(self.list_size, scored)
+
+        self.popular = heapq.nlargest(self.list_size, ((popularity(item), item_id) for item_id, item in items.items()))
+        self.items, self.lists = items, lists
+        self.built_at = datetime.utcnow()
+
+    @staticmethod
+    def score(item: dict, stage: Optional[str]) -> float:
+        item_stage = life_stage(item.get("age_range"))
+        if stage is None or item_stage is None:
+            factor = AGE_NEUTRAL
+        else:
+            factor = AGE_MATCH if item_stage == stage else AGE_MISMATCH
+        return popularity(item) * factor
+
+    def feed(self, pets: list, limit: int, offset: int = 0) -> list:
+        """Merge the candidate lists for the user's pets, best score first, without duplicates"""
+        keys = {(pet_stem(pet.get("pet_type")), life_stage(pet.get("age"))) for pet in pets}
+        candidate_lists = [self.lists[key] for key in keys if key in self.lists]
+        if not candidate_lists:
+            candidate_lists = [self.popular]
+
+        seen = set()
+        results = []
+        for _, item_id in heapq.merge(*candidate_lists, reverse=True):
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            if len(seen) > offset:
+                results.append(self.items[item_id])
+                if len(results) >= limit:
+                    break
+        return results
+
+
+personalized_feed = PersonalizedFeed(settings.FEED_CANDIDATES_PER_LIST)
+event_bus.subscribe(InventoryChanged, personalized_feed.handle_inventory_changed)
+event_bus.subscribe(CategoryChanged, personalized_feed.mark_dirty)
+
+
+async def personalized_feed_loop():
+    """
+    Rebuild after changes (at most every FEED_REBUILD_DEBOUNCE_SECONDS) and
+    every FEED_REFRESH_SECONDS. The first build happens during startup warm-up.
+    """
+    while True:
+        await asyncio.sleep(settings.FEED_REBUILD_DEBOUNCE_SECONDS)
+        stale = (
+            personalized_feed.built_at is None
+            or (datetime.utcnow() - personalized_feed.built_at).total_seconds() >= settings.FEED_REFRESH_SECONDS
+        )
+        if personalized_feed.dirty or stale:
+            try:
+                db = await get_catalog_database()
+                await personalized_feed.rebuild(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                personalized_feed.dirty = True
+                logger.error(f"Personalized feed rebuild failed: {e}")
@@ -0,0 +1,144 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.database import settings, INDEXES
+
+# One document per item, category and subcategory:
+# {_id: "<kind>:<id>", kind, ref_id, category_id, subcategory_id, units, trend}
+RANKINGS_COLLECTION = "sales_rankings"
+RANKING_KINDS = ("item", "category", "subcategory")
+
+
+def decay_weight(moment: datetime) -> float:
+    """
+    Forward decay: a sale at `moment` adds 2^((moment - epoch) / half_life).
+    Every score shrinks by the same factor as time passes, so stored scores
+    never need re-decaying and a cancellation subtracts exactly what its
+    order added. rebuild_rankings() re-bases scores if the epoch is moved.
+    """
+    hours = (moment - settings.TRENDING_EPOCH).total_seconds() / 3600
+    return 2.0 ** (hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def current_score(trend: float, now: datetime = None) -> float:
+    """A stored trend score as units sold 'recently' (decayed to now)"""
+    return trend / decay_weight(now or datetime.utcnow())
+
+
+def ranking_updates(order_time: datetime, items, sign: int = 1):
+    """
+    UpdateOne ops for one order. `items` are dicts with inventory_id, quantity,
+    category_id and subcategory_id; counters for the same key are combined.
+    """
+    weight = decay_weight(order_time)
+    totals = {}
+    for item in items:
+        quantity = sign * int(item.get("quantity", 0))
+        keys = [("item", item["inventory_id"])]
+        if item.get("category_id"):
+            keys.append(("category", item["category_id"]))
+        if item.get("subcategory_id"):
+            keys.append(("subcategory", item["subcategory_id"]))
+        for kind, ref_id in keys:
+            total = totals.setdefault((kind, ref_id), {
+                "units": 0,
+                "category_id": item.get("category_id") if kind != "category" else None,
+                "subcategory_id": item.get("subcategory_id") if kind == "item" else None,
+            })
+            total["units"] += quantity
+
+    return [
+        UpdateOne(
+            {"_id": f"{kind}:{ref_id}"},
+            {
+                "$inc": {"units": total["units"], "trend": total["units"] * weight},
+                "$set": {"kind": kind, "ref_id": ref_id, "category_id": total["category_id"],
+                         "subcategory_id": total["subcategory_id"]},
+            },
+            upsert=True
+        )
+        for (kind, ref_id), total in totals.items()
+    ]
+
+
+async def record_item_sales(db, order_time: datetime, items, sign: int = 1, session=None):
+    """Add (sign=1) or remove (sign=-1) one order's items from the rankings"""
+    operations = ranking_updates(order_time, items, sign)
+    if operations:
+        await db[RANKINGS_COLLECTION].bulk_write(operations, ordered=False, session=session)
+
+
+async def order_ranking_items(db, order_items, session=None):
+    """Attach category/subcategory from inventory to order_items for ranking updates"""
+    ids = [ObjectId(item["inventory_id"]) for item in order_items if ObjectId.is_valid(item.get("inventory_id", ""))]
+    categories = {
+        str(item["_id"]): item
+        async for item in db.inventory.find({"_id": {"$in": ids}}, {"category_id": 1, "subcategory_id": 1}, session=session)
+    }
+    return [
+        {
+            "inventory_id": item["inventory_id"],
+            "quantity": item.get("quantity", 0),
+            "category_id": categories.get(item["inventory_id"], {}).get("category_id"),
+            "subcategory_id": categories.get(item["inventory_id"], {}).get("subcategory_id"),
+        }
+        for item in order_items
+    ]
+
+
+async def top_ranked(db, kind: str, sort_field: str, limit: int, category_id: str = None, subcategory_id: str = None):
+    query = {"kind": kind, sort_field: {"$gt": 0}}
+    if category_id:
+        query["category_id"] = category_id
+    if subcategory_id:
+        query["subcategory_id"] = subcategory_id
+    return await db[RANKINGS_COLLECTION].find(query).sort(sort_field, -1).limit(limit).to_list(limit)
+
+
+async def rebuild_rankings(db, batch_size: int = 1000):
+    """
+    Recompute all counters from non-cancelled orders in _id-ordered batches
+    into a scratch collection, then swap it in. Like rebuild_daily_sales,
+    cancellations of already processed orders during the run are missed.
+    """
+    scratch = db[f"{RANKINGS_COLLECTION}_rebuild"]
+    await scratch.drop()
+
+    last_id = None
+    processed = 0
+    while True:
+        query = {"status": {"$ne": "cancelled"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        orders = await db.orders.find(query, {"order_time": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not orders:
+            break
+
+        order_times = {str(order["_id"]): order.get("order_time") for order in orders}
+        items_by_order = {}
+        async for item in db.order_items.find({"order_id": {"$in": list(order_times)}}, {"order_id": 1, "inventory_id": 1, "quantity": 1}):
+            items_by_order.setdefault(item["order_id"], []).append(item)
+
+        operations = []
+        batch_items = [item for items in items_by_order.values() for item in items]
+        with_categories = iter(await order_ranking_items(db, batch_items))
+        for order_id, items in items_by_order.items():
+            ranked = [next(with_categories) for _ in items]
+            if order_times.get(order_id):
+                operations.extend(ranking_updates(order_times[order_id], ranked))
+        if operations:
+            await scratch.bulk_write(operations, ordered=False)
+
+        last_id = orders[-1]["_id"]
+        processed += len(orders)
+
+    if processed:
+        # rename replaces the target's indexes with the scratch collection's
+        for collection, keys, options in INDEXES:
+            if collection == RANKINGS_COLLECTION:
+                await scratch.create_index(keys, **options)
+        await scratch.rename(RANKINGS_COLLECTION, dropTarget=True)
+    else:
+        await scratch.drop()
+        await db[RANKINGS_COLLECTION].delete_many({})
+    return processed
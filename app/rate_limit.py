@@ -0,0 +1,124 @@
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from fastapi import HTTPException, Request, status
+from pymongo import ReturnDocument
+from app.database import settings, get_database
+
+
+class RateLimit:
+    """Token bucket policy: `capacity` requests of burst, refilled evenly over `period_seconds`"""
+
+    def __init__(self, name: str, capacity: int, period_seconds: int):
+        self.name = name
+        self.capacity = capacity
+        self.period_seconds = period_seconds
+        self.refill_rate = capacity / period_seconds  # tokens per second
+
+
+class InMemoryBackend:
+    """Per-process buckets in an LRU-bounded dict; every operation is O(1)"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+
+    async def consume(self, key: str, limit: RateLimit, cost: int = 1) -> float:
+        """Take `cost` tokens; return 0 if allowed, else seconds until enough tokens refill"""
+        now = time.monotonic()
+        tokens, last = self.buckets.pop(key, (limit.capacity, now))
+        tokens = min(limit.capacity, tokens + (now - last) * limit.refill_rate)
+
+        if tokens >= cost:
+            tokens -= cost
+            retry_after = 0.0
+        else:
+            retry_after = (cost - tokens) / limit.refill_rate
+
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+
+class MongoBackend:
+    """Buckets shared by all workers, refilled and consumed in one atomic pipeline update"""
+
+    def __init__(self, collection_name: str = "rate_limits"):
+        self.collection_name = collection_name
+        self.indexes_ready = False
+
+    async def consume(self, key: str, limit: RateLimit, cost: int = 1) -> float:
+        db = await get_database()
+        collection = db[self.collection_name]
+        if not self.indexes_ready:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            self.indexes_ready = True
+
+        now = datetime.utcnow()
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        bucket = await collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [
+                        limit.capacity,
+                        {"$add": [{"$ifNull": ["$tokens", limit.capacity]},
+                                  {"$multiply": [elapsed_seconds, limit.refill_rate]}]}
+                    ]},
+                    "updated_at": now,
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                    # Idle buckets are full again after one period, so they can be dropped
+                    "expires_at": now + timedelta(seconds=limit.period_seconds),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (cost - bucket["tokens"]) / limit.refill_rate
+
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def enforce(self, limit: RateLimit, identity: str, cost: int = 1):
+        """Raise 429 with Retry-After if `identity` has exhausted `limit`"""
+        if not settings.RATE_LIMIT_ENABLED or not identity:
+            return
+        retry_after = await self.backend.consume(f"{limit.name}:{identity}", limit, cost)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    def per_ip(self, limit: RateLimit):
+        """FastAPI dependency that throttles by client IP before the handler runs"""
+        async def dependency(request: Request):
+            client_ip = request.client.host if request.client else "unknown"
+            await self.enforce(limit, client_ip)
+        return dependency
+
+
+def create_backend():
+    if settings.RATE_LIMIT_BACKEND == "mongo":
+        return MongoBackend()
+    return InMemoryBackend()
+
+
+rate_limiter = RateLimiter(create_backend())
+
+# Policies for the endpoints that trigger bcrypt or SMTP work
+LOGIN_PER_IP = RateLimit("login:ip", settings.RATE_LIMIT_LOGIN_PER_IP_PER_MINUTE, 60)
+LOGIN_PER_ACCOUNT = RateLimit("login:account", settings.RATE_LIMIT_LOGIN_PER_ACCOUNT_PER_MINUTE, 60)
+REGISTER_PER_IP = RateLimit("register:ip", settings.RATE_LIMIT_REGISTER_PER_IP_PER_HOUR, 3600)
+FORGOT_PASSWORD_PER_IP = RateLimit("forgot:ip", settings.RATE_LIMIT_FORGOT_PASSWORD_PER_HOUR, 3600)
+FORGOT_PASSWORD_PER_ACCOUNT = RateLimit("forgot:account", settings.RATE_LIMIT_FORGOT_PASSWORD_PER_HOUR, 3600)
@@ -0,0 +1,158 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.database import settings, get_database
+
+logger = logging.getLogger(__name__)
+
+
+class CoPurchaseRecommender:
+    """
+    "Frequently bought together" from order co-occurrence.
+
+    Items are mapped to small ints; pair counts live in a sparse adjacency
+    map (item -> {other item: orders containing both}). After each refresh
+    the top-k neighbours of every touched item are re-ranked by lift, so a
+    lookup is a dict access. New orders are folded in incrementally by _id
+    watermark; cancellations are ignored (the basket still says what goes
+    together).
+    """
+
+    def __init__(self, top_k: int, min_support: int, max_basket_size: int):
+        self.top_k = top_k
+        self.min_support = min_support
+        self.max_basket_size = max_basket_size
+        self.ids = []            # index -> inventory_id
+        self.index = {}          # inventory_id -> index
+        self.item_orders = []    # index -> orders containing the item
+        self.pairs = {}          # index -> {index: orders containing both}
+        self.top = {}            # index -> ((index, co-purchases), ...) best lift first
+        self.orders = 0
+        self.watermark = None    # _id of the last order folded in
+        self.ready = False
+        self.refreshed_at = None
+
+    def item_index(self, inventory_id: str) -> int:
+        index = self.index.get(inventory_id)
+        if index is None:
+            index = len(self.ids)
+            self.index[inventory_id] = index
+            self.ids.append(inventory_id)
+            self.item_orders.append(0)
+        return index
+
+    def add_basket(self, inventory_ids, touched: set):
+        basket = sorted({self.item_index(inventory_id) for inventory_id in inventory_ids})
+        self.orders += 1
+        for index in basket:
+            self.item_orders[index] += 1
+        # Their counts moved, so the lift of their existing pairs did too
+        touched.update(basket)
+        # Very large baskets (bulk/B2B orders) say little about pairing and cost O(n^2)
+        if len(basket) < 2 or len(basket) > self.max_basket_size:
+            return
+        for position, a in enumerate(basket):
+            neighbours = self.pairs.setdefault(a, {})
+            for b in basket[position + 1:]:
+                neighbours[b] = neighbours.get(b, 0) + 1
+                other = self.pairs.setdefault(b, {})
+                other[a] = other.get(a, 0) + 1
+
+    def rank(self, touched: set):
+        # New orders change the counts of their items, which shifts the lift of
+        # every pair those items are in. Scaling by the order total does not
+        # change the ordering, so lift is recomputed when answering instead.
+        affected = set(touched)
+        for a in touched:
+            affected.update(self.pairs.get(a, ()))
+        orders = self.orders
+        for a in affected:
+            count_a = self.item_orders[a]
+            candidates = (
+                (b, count * orders / (count_a * self.item_orders[b]), count)
+                for b, count in self.pairs.get(a, {}).items()
+                if count >= self.min_support
+            )
+            top = heapq.nlargest(self.top_k, candidates, key=lambda c: (c[1], c[2]))
+            self.top[a] = tuple((b, count) for b, _, count in top)
+
+    def recommend(self, inventory_id: str, limit: int):
+        index = self.index.get(inventory_id)
+        if index is None:
+            return []
+        count_a = self.item_orders[index]
+        return [
+            {
+                "inventory_id": self.ids[b],
+                "lift": round(count * self.orders / (count_a * self.item_orders[b]), 3),
+                "confidence": round(count / count_a, 3),
+                "co_purchases": count,
+            }
+            for b, count in self.top.get(index, ())[:limit]
+        ]
+
+    async def refresh(self, db, batch_size: int = 1000, settle_seconds: int = 10) -> int:
+        """Fold in orders created since the watermark; returns how many were added"""
+        # Orders younger than settle_seconds may still be inserting their items
+        upper = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=settle_seconds))
+        touched = set()
+        added = 0
+        while True:
+            query = {"_id": {"$lt": upper}, "status": {"$ne": "cancelled"}}
+            if self.watermark is not None:
+                query["_id"]["$gt"] = self.watermark
+            orders = await db.orders.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not orders:
+                break
+
+            baskets = {}
+            order_ids = [str(order["_id"]) for order in orders]
+            async for item in db.order_items.find({"order_id": {"$in": order_ids}}, {"order_id": 1, "inventory_id": 1}):
+                baskets.setdefault(item["order_id"], []).append(item["inventory_id"])
+            for order_id in order_ids:
+                if order_id in baskets:
+                    self.add_basket(baskets[order_id], touched)
+                    added += 1
+
+            self.watermark = orders[-1]["_id"]
+            await asyncio.sleep(0)  # Let requests run between batches of a full build
+
+        self.rank(touched)
+        self.ready = True
+        self.refreshed_at = datetime.utcnow()
+        return added
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "orders": self.orders,
+            "items": len(self.ids),
+            "pairs": sum(len(neighbours) for neighbours in self.pairs.values()) // 2,
+            "refreshed_at": self.refreshed_at,
+        }
+
+
+recommender = CoPurchaseRecommender(
+    settings.RECOMMENDATIONS_TOP_K,
+    settings.RECOMMENDATIONS_MIN_SUPPORT,
+    settings.RECOMMENDATIONS_MAX_BASKET_SIZE
+)
+
+
+async def recommendations_loop():
+    """Initial build from all orders, then incremental refreshes"""
+    if not settings.RECOMMENDATIONS_ENABLED:
+        return
+    while True:
+        try:
+            db = await get_database()
+            added = await recommender.refresh(db)
+            if added:
+                logger.info(f"Recommendations: folded in {added} orders ({recommender.orders} total)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Recommendations refresh failed: {e}")
+        await asyncio.sleep(settings.RECOMMENDATIONS_REFRESH_SECONDS)
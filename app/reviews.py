@@ -0,0 +1,96 @@
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+# Maintained from the reviews collection only; stripped from admin writes
+REVIEW_AGGREGATE_FIELDS = ("rating", "num_reviews", "rating_sum")
+EMPTY_REVIEW_AGGREGATES = {"rating": 0.0, "num_reviews": 0, "rating_sum": 0}
+
+
+async def apply_review_delta(db, inventory_id: str, rating_delta: int, count_delta: int, session=None):
+    """
+    Add to the item's rating_sum/num_reviews, then derive the average from the
+    values that increment produced. The average is only written if no other
+    review landed in between; that review's own update sets it instead.
+    """
+    item = await db.inventory.find_one_and_update(
+        {"_id": ObjectId(inventory_id)},
+        # Pipeline update so items rated before rating_sum existed start from rating * num_reviews
+        [{"$set": {
+            "rating_sum": {"$add": [
+                {"$ifNull": ["$rating_sum", {"$multiply": [
+                    {"$ifNull": ["$rating", 0]}, {"$ifNull": ["$num_reviews", 0]}
+                ]}]},
+                rating_delta
+            ]},
+            "num_reviews": {"$add": [{"$ifNull": ["$num_reviews", 0]}, count_delta]}
+        }}],
+        projection={"rating_sum": 1, "num_reviews": 1},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if item is None:
+        return
+    rating_sum, num_reviews = item["rating_sum"], item["num_reviews"]
+    await db.inventory.update_one(
+        {"_id": item["_id"], "rating_sum": rating_sum, "num_reviews": num_reviews},
+        {"$set": {"rating": average_rating(rating_sum, num_reviews)}},
+        session=session
+    )
+
+
+def average_rating(rating_sum: float, num_reviews: int) -> float:
+    return round(rating_sum / num_reviews, 2) if num_reviews > 0 else 0.0
+
+
+async def reconcile_review_aggregates(db, batch_size: int = 500, fix: bool = True, max_details: int = 100) -> dict:
+    """
+    Compare each item's rating_sum/num_reviews/rating with its reviews, in
+    _id-ordered batches, and (with fix=True) correct the ones that drifted.
+    Items whose counters were set by hand before reviews existed show up here
+    too. A review written between the two reads of a batch can be counted
+    twice, so run it off-peak.
+    """
+    checked = 0
+    mismatched = 0
+    details = []
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        items = await db.inventory.find(
+            query, {"rating_sum": 1, "num_reviews": 1, "rating": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not items:
+            break
+        last_id = items[-1]["_id"]
+        checked += len(items)
+
+        actual = {
+            group["_id"]: group
+            async for group in db.reviews.aggregate([
+                {"$match": {"inventory_id": {"$in": [str(item["_id"]) for item in items]}}},
+                {"$group": {"_id": "$inventory_id", "rating_sum": {"$sum": "$rating"}, "num_reviews": {"$sum": 1}}}
+            ])
+        }
+
+        fixes = []
+        for item in items:
+            group = actual.get(str(item["_id"]), {"rating_sum": 0, "num_reviews": 0})
+            expected = {
+                "rating_sum": group["rating_sum"],
+                "num_reviews": group["num_reviews"],
+                "rating": average_rating(group["rating_sum"], group["num_reviews"]),
+            }
+            stored = {field: item.get(field) for field in expected}
+            if stored != expected:
+                mismatched += 1
+                if len(details) < max_details:
+                    details.append({"inventory_id": str(item["_id"]), "stored": stored, "expected": expected})
+                # Only overwrite if no review changed the counters since they were read
+                fixes.append(UpdateOne(
+                    {"_id": item["_id"], "rating_sum": item.get("rating_sum"), "num_reviews": item.get("num_reviews")},
+                    {"$set": expected}
+                ))
+        if fix and fixes:
+            await db.inventory.bulk_write(fixes, ordered=False)
+
+    return {"checked": checked, "mismatched": mismatched, "fixed": fix, "details": details}
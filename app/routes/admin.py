@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+import re
 from bson import ObjectId
-from app.models import DashboardStats, RecentOrder
-from app.database import get_database
+from app.models import DashboardStats, RecentOrder, AdminUserSummary
+from app.serialization import models_response
+from app.database import get_database, settings
+from app.analytics import get_sales_series, GRANULARITIES
+from app.events import change_consumer, low_stock_monitor
+from app.maintenance import guest_cleanup_stats, run_guest_cleanup
+from app.denormalization import JOBS_COLLECTION as DENORMALIZATION_JOBS
+from app.cascade import JOBS_COLLECTION as CASCADE_JOBS
+from app.customer_stats import USER_ORDER_STATS_COLLECTION, seed_missing_user_order_stats
 from app.routes.users import get_current_user
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -35,8 +43,11 @@ async def get_dashboard_stats(admin_user: dict = Depends(verify_admin)):
     total_users_count = await db.users.count_documents({})
     active_users_count = await db.users.count_documents({"last_login_time": {"$ne": None}})
     
-    # Low Stock Items (less than 10 units)
-    low_stock_count = await db.inventory.count_documents({"stock": {"$lt": 10}})
+    # Low Stock Items (less than LOW_STOCK_THRESHOLD units)
+    if change_consumer.live and low_stock_monitor.ready:
+        low_stock_count = len(low_stock_monitor.items)
+    else:
+        low_stock_count = await db.inventory.count_documents({"stock": {"$lt": settings.LOW_STOCK_THRESHOLD}})
     
     return DashboardStats(
         total_revenue=round(total_revenue, 2),
@@ -48,46 +59,94 @@ async def get_dashboard_stats(admin_user: dict = Depends(verify_admin)):
     )
 
 
+def encode_orders_cursor(order: dict) -> str:
+    return f"{order['order_time'].isoformat()}|{order['_id']}"
+
+
+def decode_orders_cursor(cursor: str) -> dict:
+    """Filter for orders strictly older than the cursor, in (order_time, _id) order"""
+    try:
+        order_time, order_id = cursor.split("|", 1)
+        order_time = datetime.fromisoformat(order_time)
+        order_id = ObjectId(order_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"order_time": {"$lt": order_time}},
+        {"order_time": order_time, "_id": {"$lt": order_id}}
+    ]}
+
+
 @router.get("/dashboard/recent-orders", response_model=List[RecentOrder])
-async def get_recent_orders(admin_user: dict = Depends(verify_admin)):
+async def get_recent_orders(
+    response: Response,
+    limit: int = Query(settings.ADMIN_RECENT_ORDERS_LIMIT, ge=1, le=settings.ADMIN_RECENT_ORDERS_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    admin_user: dict = Depends(verify_admin)
+):
+    """Newest orders first. Pass the X-Next-Cursor response header back as `cursor` for the next page."""
     db = await get_database()
     
-    orders = await db.orders.find().sort("order_time", -1).limit(10).to_list(10)
+    pipeline = []
+    if cursor:
+        pipeline.append({"$match": decode_orders_cursor(cursor)})
+    pipeline += [
+        {"$sort": {"order_time": -1, "_id": -1}},
+        {"$limit": limit},
+        # Orders created before customer fields were denormalized fall back to one indexed users lookup
+        {"$addFields": {"_customer_oid": {"$cond": [
+            {"$ifNull": ["$customer_name", False]},
+            None,
+            {"$convert": {"input": "$user_id", "to": "objectId", "onError": None, "onNull": None}}
+        ]}}},
+        {"$lookup": {"from": "users", "localField": "_customer_oid", "foreignField": "_id", "as": "_customer"}},
+        {"$project": {
+            "order_time": 1,
+            "status": 1,
+            "total": {"$ifNull": ["$total", 0]},
+            "customer_name": {"$ifNull": [
+                "$customer_name", {"$ifNull": [{"$arrayElemAt": ["$_customer.full_name", 0]}, "Unknown"]}
+            ]},
+            "customer_email": {"$ifNull": [
+                "$customer_email", {"$ifNull": [{"$arrayElemAt": ["$_customer.email", 0]}, ""]}
+            ]}
+        }}
+    ]
+    orders = await db.orders.aggregate(pipeline).to_list(limit)
     
-    recent_orders = []
-    for order in orders:
-        # Get user details
-        user = await db.users.find_one({"_id": ObjectId(order["user_id"])})
-        
-        # Calculate total
-        order_items = await db.order_items.find({"order_id": str(order["_id"])}).to_list(None)
-        total = sum(item["price"] * item["quantity"] for item in order_items)
-        
-        recent_orders.append(RecentOrder(
-            _id=str(order["_id"]),
-            customer_name=user.get("full_name", "Unknown") if user else "Unknown",
-            customer_email=user.get("email", "") if user else "",
-            total=round(total, 2),
-            status=order["status"],
-            date=order["order_time"]
-        ))
+    if len(orders) == limit:
+        response.headers["X-Next-Cursor"] = encode_orders_cursor(orders[-1])
     
-    return recent_orders
+    return [RecentOrder(
+        _id=str(order["_id"]),
+        customer_name=order["customer_name"],
+        customer_email=order["customer_email"],
+        total=round(order["total"], 2),
+        status=order["status"],
+        date=order["order_time"]
+    ) for order in orders]
 
 
 @router.get("/inventory/low-stock")
 async def get_low_stock_items(admin_user: dict = Depends(verify_admin)):
-    db = await get_database()
-    
-    low_stock_items = await db.inventory.find({"stock": {"$lt": 10}}).to_list(None)
+    # Served from the change-stream maintained snapshot when events are flowing
+    if change_consumer.live and low_stock_monitor.ready:
+        low_stock_items = low_stock_monitor.snapshot()
+    else:
+        db = await get_database()
+        cursor = db.inventory.find(
+            {"stock": {"$lt": settings.LOW_STOCK_THRESHOLD}}, {"name": 1, "stock": 1}
+        ).sort("stock", 1)
+        low_stock_items = [{"id": str(item["_id"]), "name": item.get("name", "Unknown"), "stock": item.get("stock", 0)}
+                           async for item in cursor]
     
     result = []
     for item in low_stock_items:
         result.append({
-            "id": str(item["_id"]),
-            "product_name": item.get("product_name", "Unknown"),
+            "id": item["id"],
+            "product_name": item["name"],
             "stock": item["stock"],
-            "status": "Low Stock" if item["stock"] < 10 else "Out of Stock"
+            "status": "Out of Stock" if item["stock"] <= 0 else "Low Stock"
         })
     
     return result
@@ -108,6 +167,73 @@ async def get_user_statistics(admin_user: dict = Depends(verify_admin)):
     }
 
 
+@router.get("/users", response_model=List[AdminUserSummary])
+async def list_users(
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    role: Optional[str] = "user",
+    limit: int = Query(25, ge=1, le=100),
+    cursor: Optional[str] = None,
+    admin_user: dict = Depends(verify_admin)
+):
+    """
+    Newest users first, with order totals. `q` is a case-sensitive prefix of
+    username, email or full name (each indexed). Pass the X-Next-Cursor
+    response header back as `cursor` for the next page.
+    """
+    db = await get_database()
+    
+    query = {}
+    if role:
+        query["role"] = role
+    if q:
+        prefix = {"$regex": f"^{re.escape(q)}"}
+        query["$or"] = [{"username": prefix}, {"email": prefix}, {"full_name": prefix}]
+    if cursor:
+        if not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["_id"] = {"$lt": ObjectId(cursor)}
+    
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"_id": -1}},
+        {"$limit": limit},
+        {"$project": {
+            "username": 1, "email": 1, "full_name": 1, "role": 1, "status": 1,
+            "register_time": 1, "last_login_time": 1,
+            "user_id": {"$toString": "$_id"}
+        }},
+        # Per-user order counters: one _id lookup per user on the page
+        {"$lookup": {
+            "from": USER_ORDER_STATS_COLLECTION,
+            "localField": "user_id",
+            "foreignField": "_id",
+            "as": "_stats"
+        }},
+        {"$addFields": {
+            "total_orders": {"$ifNull": [{"$arrayElemAt": ["$_stats.order_count", 0]}, 0]},
+            "total_spent": {"$ifNull": [{"$arrayElemAt": ["$_stats.total_spent", 0]}, 0]},
+            "_has_stats": {"$gt": [{"$size": "$_stats"}, 0]}
+        }},
+        {"$project": {"_stats": 0, "user_id": 0}}
+    ]
+    users = await db.users.aggregate(pipeline).to_list(limit)
+    
+    # Customers with orders from before counters existed have none yet
+    missing = [str(user["_id"]) for user in users if not user.pop("_has_stats")]
+    seeded = await seed_missing_user_order_stats(db, missing)
+    for user in users:
+        user["_id"] = str(user["_id"])
+        if user["_id"] in seeded:
+            user["total_orders"] = seeded[user["_id"]].get("order_count", 0)
+            user["total_spent"] = seeded[user["_id"]].get("total_spent", 0)
+        user["total_spent"] = round(user["total_spent"], 2)
+    
+    result = models_response(AdminUserSummary, users)
+    if len(users) == limit:
+        result.headers["X-Next-Cursor"] = users[-1]["_id"]
+    return result
+
+
 @router.get("/orders/stats")
 async def get_order_statistics(admin_user: dict = Depends(verify_admin)):
     db = await get_database()
@@ -122,6 +248,129 @@ async def get_order_statistics(admin_user: dict = Depends(verify_admin)):
     return stats
 
 
+def to_naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/analytics/sales")
+async def get_sales_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = Query("day"),
+    admin_user: dict = Depends(verify_admin)
+):
+    """Revenue, order count and average basket per day/week/month, served from daily rollups"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    
+    # Rollups are bucketed by naive UTC day; convert offsets like "...Z" or "+05:00"
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start).days > 366 * 5:
+        raise HTTPException(status_code=400, detail="Range cannot exceed 5 years")
+    
+    db = await get_database()
+    series = await get_sales_series(db, start, end, granularity)
+    
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "total_revenue": round(sum(p["revenue"] for p in series), 2),
+        "total_orders": sum(p["orders"] for p in series),
+        "series": series
+    }
+
+
+@router.get("/maintenance/guest-cleanup")
+async def get_guest_cleanup_stats(admin_user: dict = Depends(verify_admin)):
+    """Last orphaned cart item sweep in this worker, plus guest collection sizes"""
+    return {
+        "cart_retention_days": settings.GUEST_CART_RETENTION_DAYS,
+        "wishlist_retention_days": settings.GUEST_WISHLIST_RETENTION_DAYS,
+        **guest_cleanup_stats
+    }
+
+
+@router.post("/maintenance/guest-cleanup")
+async def trigger_guest_cleanup(admin_user: dict = Depends(verify_admin)):
+    """Run the orphaned cart item sweep now"""
+    return await run_guest_cleanup()
+
+
+def serialize_job(job: dict) -> dict:
+    job["_id"] = str(job["_id"])
+    return job
+
+
+@router.get("/maintenance/denormalization")
+async def list_denormalization_jobs(
+    job_status: Optional[str] = Query(None, alias="status"),
+    user_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    admin_user: dict = Depends(verify_admin)
+):
+    """Recent fan-out jobs for user field changes, newest first"""
+    db = await get_database()
+    query = {}
+    if job_status:
+        query["status"] = job_status
+    if user_id:
+        query["user_id"] = user_id
+    jobs = await db[DENORMALIZATION_JOBS].find(query).sort("_id", -1).limit(limit).to_list(limit)
+    return [serialize_job(job) for job in jobs]
+
+
+@router.get("/maintenance/denormalization/{job_id}")
+async def get_denormalization_job(job_id: str, admin_user: dict = Depends(verify_admin)):
+    """Progress of one fan-out job: documents updated and completion per collection"""
+    db = await get_database()
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await db[DENORMALIZATION_JOBS].find_one({"_id": ObjectId(job_id)})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
+
+
+@router.get("/maintenance/cascades")
+async def list_cascade_jobs(
+    job_status: Optional[str] = Query(None, alias="status"),
+    kind: Optional[str] = Query(None, description="user or inventory"),
+    ref_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    admin_user: dict = Depends(verify_admin)
+):
+    """Recent cleanup jobs for deleted users and inventory items, newest first"""
+    db = await get_database()
+    query = {}
+    if job_status:
+        query["status"] = job_status
+    if kind:
+        query["kind"] = kind
+    if ref_id:
+        query["ref_id"] = ref_id
+    jobs = await db[CASCADE_JOBS].find(query).sort("_id", -1).limit(limit).to_list(limit)
+    return [serialize_job(job) for job in jobs]
+
+
+@router.get("/maintenance/cascades/{job_id}")
+async def get_cascade_job(job_id: str, admin_user: dict = Depends(verify_admin)):
+    """Progress of one cleanup job: documents removed or anonymized and completion per step"""
+    db = await get_database()
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await db[CASCADE_JOBS].find_one({"_id": ObjectId(job_id)})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
+
+
 @router.post("/init-admin")
 async def initialize_admin():
     """Initialize admin user - call this once during setup"""
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Header
+from typing import List, Optional
 from bson import ObjectId
 from app.models import (
     CartResponse, CartItemCreate, CartItemResponse, 
     CartItemUpdate
 )
-from app.database import get_database
+from app.database import get_database, causal_session
+from app.idempotency import idempotent
 from app.routes.users import get_current_user
 from pydantic import BaseModel
 
@@ -61,62 +62,78 @@ async def get_cart_items(current_user: dict = Depends(get_current_user)):
 
 
 @router.post("/items", response_model=CartItemResponse, status_code=status.HTTP_201_CREATED)
-async def add_to_cart(cart_item: CartItemCreate, current_user: dict = Depends(get_current_user)):
+async def add_to_cart(
+    cart_item: CartItemCreate,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Add an item to the cart. Retries with the same Idempotency-Key don't add the quantity twice."""
+    return await idempotent(
+        idempotency_key, "add_to_cart", str(current_user["_id"]), cart_item.dict(),
+        lambda: add_item_to_cart(cart_item, current_user),
+        status_code=status.HTTP_201_CREATED
+    )
+
+
+async def add_item_to_cart(cart_item: CartItemCreate, current_user: dict):
     db = await get_database()
     user_id = str(current_user["_id"])
     
     print(f"Adding to cart for user_id: {user_id}")
     print(f"Cart item data: inventory_id={cart_item.inventory_id}, quantity={cart_item.quantity}")
     
-    # Get or create cart
-    cart = await db.carts.find_one({"user_id": user_id})
-    if not cart:
-        from datetime import datetime
-        cart_dict = {
-            "user_id": user_id,
-            "created_at": datetime.utcnow()
-        }
-        result = await db.carts.insert_one(cart_dict)
-        cart_id = str(result.inserted_id)
-        print(f"Created new cart with cart_id: {cart_id}")
-    else:
-        cart_id = str(cart["_id"])
-        print(f"Using existing cart_id: {cart_id}")
-    
-    # Verify inventory item exists
-    if not ObjectId.is_valid(cart_item.inventory_id):
-        print(f"Invalid inventory ID format: {cart_item.inventory_id}")
-        raise HTTPException(status_code=400, detail="Invalid inventory ID")
-    
-    inventory = await db.inventory.find_one({"_id": ObjectId(cart_item.inventory_id)})
-    if not inventory:
-        print(f"Inventory item not found: {cart_item.inventory_id}")
-        raise HTTPException(status_code=404, detail="Inventory item not found")
-    
-    # Check if item already in cart
-    existing_item = await db.cart_items.find_one({
-        "cart_id": cart_id,
-        "inventory_id": cart_item.inventory_id
-    })
-    
-    if existing_item:
-        # Update quantity
-        new_quantity = existing_item["quantity"] + cart_item.quantity
-        await db.cart_items.update_one(
-            {"_id": existing_item["_id"]},
-            {"$set": {"quantity": new_quantity}}
-        )
-        existing_item["_id"] = str(existing_item["_id"])
-        existing_item["quantity"] = new_quantity
-        return CartItemResponse(**existing_item)
-    
-    # Add new item
-    cart_item_dict = cart_item.dict()
-    cart_item_dict["cart_id"] = cart_id
-    result = await db.cart_items.insert_one(cart_item_dict)
-    cart_item_dict["_id"] = str(result.inserted_id)
-    
-    return CartItemResponse(**cart_item_dict)
+    # Causal session: the item lookup below observes a cart created in this same request
+    async with causal_session() as session:
+        # Get or create cart
+        cart = await db.carts.find_one({"user_id": user_id}, session=session)
+        if not cart:
+            from datetime import datetime
+            cart_dict = {
+                "user_id": user_id,
+                "created_at": datetime.utcnow()
+            }
+            result = await db.carts.insert_one(cart_dict, session=session)
+            cart_id = str(result.inserted_id)
+            print(f"Created new cart with cart_id: {cart_id}")
+        else:
+            cart_id = str(cart["_id"])
+            print(f"Using existing cart_id: {cart_id}")
+
+        # Verify inventory item exists
+        if not ObjectId.is_valid(cart_item.inventory_id):
+            print(f"Invalid inventory ID format: {cart_item.inventory_id}")
+            raise HTTPException(status_code=400, detail="Invalid inventory ID")
+
+        inventory = await db.inventory.find_one({"_id": ObjectId(cart_item.inventory_id)}, session=session)
+        if not inventory:
+            print(f"Inventory item not found: {cart_item.inventory_id}")
+            raise HTTPException(status_code=404, detail="Inventory item not found")
+
+        # Check if item already in cart
+        existing_item = await db.cart_items.find_one({
+            "cart_id": cart_id,
+            "inventory_id": cart_item.inventory_id
+        }, session=session)
+
+        if existing_item:
+            # Update quantity
+            new_quantity = existing_item["quantity"] + cart_item.quantity
+            await db.cart_items.update_one(
+                {"_id": existing_item["_id"]},
+                {"$set": {"quantity": new_quantity}},
+                session=session
+            )
+            existing_item["_id"] = str(existing_item["_id"])
+            existing_item["quantity"] = new_quantity
+            return CartItemResponse(**existing_item)
+
+        # Add new item
+        cart_item_dict = cart_item.dict()
+        cart_item_dict["cart_id"] = cart_id
+        result = await db.cart_items.insert_one(cart_item_dict, session=session)
+        cart_item_dict["_id"] = str(result.inserted_id)
+
+        return CartItemResponse(**cart_item_dict)
 
 
 @router.put("/items/{cart_item_id}", response_model=CartItemResponse)
@@ -209,8 +226,19 @@ async def get_guest_cart(guest_id: str):
 
 
 @router.post("/{guest_id}/sync")
-async def sync_guest_cart(guest_id: str, request: CartSyncRequest):
+async def sync_guest_cart(
+    guest_id: str,
+    request: CartSyncRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """Sync guest cart items to database"""
+    return await idempotent(
+        idempotency_key, "sync_guest_cart", guest_id, request.dict(),
+        lambda: sync_guest_cart_items(guest_id, request)
+    )
+
+
+async def sync_guest_cart_items(guest_id: str, request: CartSyncRequest):
     db = await get_database()
     from datetime import datetime
     
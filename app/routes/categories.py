@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 from bson import ObjectId
 from app.models import CategoryCreate, CategoryResponse, CategoryUpdate
-from app.database import get_database
+from app.database import get_database, get_catalog_database
+from app.serialization import model_response, models_response
 from app.routes.users import get_current_user
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
@@ -27,18 +28,14 @@ async def create_category(category: CategoryCreate, admin_user: dict = Depends(v
 
 @router.get("/", response_model=List[CategoryResponse])
 async def get_all_categories():
-    db = await get_database()
+    db = await get_catalog_database()
     categories = await db.categories.find().to_list(1000)
-    
-    for category in categories:
-        category["_id"] = str(category["_id"])
-    
-    return [CategoryResponse(**category) for category in categories]
+    return models_response(CategoryResponse, categories)
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
 async def get_category(category_id: str):
-    db = await get_database()
+    db = await get_catalog_database()
     
     if not ObjectId.is_valid(category_id):
         raise HTTPException(status_code=400, detail="Invalid category ID")
@@ -47,8 +44,7 @@ async def get_category(category_id: str):
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    category["_id"] = str(category["_id"])
-    return CategoryResponse(**category)
+    return model_response(CategoryResponse, category)
 
 
 @router.put("/{category_id}", response_model=CategoryResponse)
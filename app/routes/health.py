@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Response, status
+from datetime import datetime
+from app.health import check_readiness, startup_state
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+async def liveness():
+    """The process is up and its event loop answers; never touches MongoDB"""
+    return {
+        "status": "alive",
+        "uptime_seconds": int((datetime.utcnow() - startup_state["started_at"]).total_seconds())
+    }
+
+
+@router.get("/ready")
+async def readiness(response: Response):
+    """200 once this worker is warmed up and healthy, 503 otherwise (take it out of rotation)"""
+    report = await check_readiness()
+    if not report["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
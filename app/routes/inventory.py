@@ -1,10 +1,21 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+import logging
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
 from typing import List, Optional
 from bson import ObjectId
+from datetime import datetime
 from app.models import InventoryCreate, InventoryResponse, InventoryUpdate
-from app.database import get_database
+from app.database import settings, get_database, get_catalog_database
+from app.recommendations import recommender
+from app.personalization import personalized_feed
+from app.rankings import top_ranked, current_score
+from app.inventory_import import IMPORT_FORMATS, IMPORT_KEYS, detect_format, iter_rows, import_inventory
+from app.serialization import construct, model_response, models_response
+from app.cascade import enqueue_cascade
+from app.reviews import REVIEW_AGGREGATE_FIELDS, EMPTY_REVIEW_AGGREGATES
 from app.routes.users import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
 
@@ -40,19 +51,55 @@ async def create_inventory_item(inventory: InventoryCreate, admin_user: dict = D
             raise HTTPException(status_code=404, detail="Subcategory not found")
     
     inventory_dict = inventory.dict()
+    # Ratings come from reviews only
+    inventory_dict.update(EMPTY_REVIEW_AGGREGATES)
     result = await db.inventory.insert_one(inventory_dict)
     inventory_dict["_id"] = str(result.inserted_id)
     
     return InventoryResponse(**inventory_dict)
 
 
+@router.post("/import")
+async def import_inventory_items(
+    request: Request,
+    file_format: Optional[str] = Query(None, alias="format"),
+    key: str = Query("sku"),
+    ordered: bool = False,
+    dry_run: bool = False,
+    admin_user: dict = Depends(verify_admin)
+):
+    """
+    Bulk create/update inventory from a CSV or NDJSON request body (sent
+    as-is, not multipart). Rows are matched on `key` (sku or name), streamed
+    and written in batches; the response lists the rows that failed.
+    """
+    file_format = file_format or detect_format(request.headers.get("content-type"))
+    if file_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Send text/csv or application/x-ndjson, or pass format=csv|ndjson")
+    if key not in IMPORT_KEYS:
+        raise HTTPException(status_code=400, detail="key must be 'sku' or 'name'")
+
+    db = await get_database()
+    report = await import_inventory(
+        db,
+        iter_rows(request.stream(), file_format),
+        key=key,
+        ordered=ordered,
+        dry_run=dry_run,
+        batch_size=settings.INVENTORY_IMPORT_BATCH_SIZE,
+        max_errors=settings.INVENTORY_IMPORT_MAX_ERRORS
+    )
+    logger.info(f"Inventory import: {report['rows']} rows, {report['valid']} valid, {report['upserted']} created, {report['modified']} updated")
+    return report
+
+
 @router.get("/", response_model=List[InventoryResponse])
 async def get_all_inventory(
     category_id: Optional[str] = None,
     subcategory_id: Optional[str] = None,
     is_visible: Optional[bool] = None
 ):
-    db = await get_database()
+    db = await get_catalog_database()
     
     query = {}
     
@@ -65,19 +112,71 @@ async def get_all_inventory(
     
     try:
         inventory_items = await db.inventory.find(query).to_list(1000)
-        
-        for item in inventory_items:
-            item["_id"] = str(item["_id"])
-        
-        return [InventoryResponse(**item) for item in inventory_items]
+        return models_response(InventoryResponse, inventory_items)
     except Exception as e:
         # Return empty list on error instead of failing
         return []
 
 
+async def ranked_inventory(sort_field: str, limit: int, category_id: Optional[str], subcategory_id: Optional[str]):
+    db = await get_catalog_database()
+    ranked = await top_ranked(db, "item", sort_field, limit, category_id, subcategory_id)
+    ids = [ObjectId(entry["ref_id"]) for entry in ranked if ObjectId.is_valid(entry["ref_id"])]
+    items = {str(item["_id"]): item async for item in db.inventory.find({"_id": {"$in": ids}, "is_visible": True})}
+    return models_response(InventoryResponse, [items[entry["ref_id"]] for entry in ranked if entry["ref_id"] in items])
+
+
+@router.get("/trending", response_model=List[InventoryResponse])
+async def get_trending_inventory(
+    limit: int = Query(20, ge=1, le=100),
+    category_id: Optional[str] = None,
+    subcategory_id: Optional[str] = None
+):
+    """Items selling fastest recently (sales decayed with TRENDING_HALF_LIFE_HOURS)"""
+    return await ranked_inventory("trend", limit, category_id, subcategory_id)
+
+
+@router.get("/bestsellers", response_model=List[InventoryResponse])
+async def get_bestseller_inventory(
+    limit: int = Query(20, ge=1, le=100),
+    category_id: Optional[str] = None,
+    subcategory_id: Optional[str] = None
+):
+    """Items with the most units sold overall"""
+    return await ranked_inventory("units", limit, category_id, subcategory_id)
+
+
+@router.get("/trending/categories")
+async def get_trending_categories(limit: int = Query(10, ge=1, le=100)):
+    """Categories and subcategories ranked by recent sales"""
+    db = await get_catalog_database()
+    now = datetime.utcnow()
+    return {
+        kind: [
+            {"id": entry["ref_id"], "recent_units": round(current_score(entry["trend"], now), 2), "units": entry["units"]}
+            for entry in await top_ranked(db, kind, "trend", limit)
+        ]
+        for kind in ("category", "subcategory")
+    }
+
+
+@router.get("/for-me", response_model=List[InventoryResponse])
+async def get_personalized_inventory(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """Visible inventory ranked for the user's pets (type, life stage, popularity)"""
+    db = await get_database()
+    pets = await db.user_pet_profiles.find(
+        {"user_id": str(current_user["_id"])}, {"pet_type": 1, "age": 1}
+    ).to_list(100)
+    return models_response(InventoryResponse, personalized_feed.feed(pets, limit, offset))
+
+
 @router.get("/{inventory_id}", response_model=InventoryResponse)
 async def get_inventory_item(inventory_id: str):
-    db = await get_database()
+    db = await get_catalog_database()
     
     if not ObjectId.is_valid(inventory_id):
         raise HTTPException(status_code=400, detail="Invalid inventory ID")
@@ -86,8 +185,30 @@ async def get_inventory_item(inventory_id: str):
     if not item:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
-    item["_id"] = str(item["_id"])
-    return InventoryResponse(**item)
+    return model_response(InventoryResponse, item)
+
+
+@router.get("/{inventory_id}/recommendations")
+async def get_inventory_recommendations(
+    inventory_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    include_items: bool = False
+):
+    """Items most often bought together with this one, ranked by lift"""
+    if not ObjectId.is_valid(inventory_id):
+        raise HTTPException(status_code=400, detail="Invalid inventory ID")
+
+    recommendations = recommender.recommend(inventory_id, limit)
+    if include_items and recommendations:
+        db = await get_catalog_database()
+        ids = [ObjectId(r["inventory_id"]) for r in recommendations]
+        items = {str(item["_id"]): item async for item in db.inventory.find({"_id": {"$in": ids}, "is_visible": True})}
+        recommendations = [
+            {**r, "item": construct(InventoryResponse, items[r["inventory_id"]])}
+            for r in recommendations
+            if r["inventory_id"] in items
+        ]
+    return {"inventory_id": inventory_id, "ready": recommender.ready, "recommendations": recommendations}
 
 
 @router.put("/{inventory_id}", response_model=InventoryResponse)
@@ -107,6 +228,8 @@ async def update_inventory_item(
     # Remove internal fields
     update_data.pop('id', None)
     update_data.pop('_id', None)
+    for field in REVIEW_AGGREGATE_FIELDS:
+        update_data.pop(field, None)
     
     print(f"Updating inventory {inventory_id} with data: {update_data}")  # Debug log
     
@@ -138,4 +261,7 @@ async def delete_inventory_item(inventory_id: str, admin_user: dict = Depends(ve
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
+    # Cart lines, wishlist entries, reviews and rankings for the item are removed in the background
+    await enqueue_cascade(db, "inventory", inventory_id)
+    
     return None
@@ -1,19 +1,42 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+import logging
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Header
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from bson import ObjectId
 from datetime import datetime
+from pymongo.errors import PyMongoError
 from app.models import (
     OrderCreate, OrderResponse, OrderUpdate,
     OrderItemCreate, OrderItemResponse
 )
-from app.database import get_database
+from app.database import get_database, causal_session, settings
+from app.analytics import record_order_sales
+from app.rankings import record_item_sales, order_ranking_items
+from app.customer_stats import record_user_order
+from app.events import change_consumer
+from app.notifications import order_status_broker, order_status_stream
+from app.idempotency import idempotent
 from app.routes.users import get_current_user
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
+logger = logging.getLogger(__name__)
 
 
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-async def create_order(order: OrderCreate, current_user: dict = Depends(get_current_user)):
+async def create_order(
+    order: OrderCreate,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Place an order from the cart. Retries with the same Idempotency-Key replay the first result."""
+    return await idempotent(
+        idempotency_key, "create_order", str(current_user["_id"]), order.dict(),
+        lambda: place_order(order, current_user),
+        status_code=status.HTTP_201_CREATED
+    )
+
+
+async def place_order(order: OrderCreate, current_user: dict):
     db = await get_database()
     
     # Check if user is banned
@@ -28,89 +51,108 @@ async def create_order(order: OrderCreate, current_user: dict = Depends(get_curr
     print(f"\n=== Creating order for user_id: {user_id} ===")
     print(f"User email: {current_user.get('email')}, Role: {current_user.get('role')}")
     
-    cart = await db.carts.find_one({"user_id": user_id})
-    
-    if not cart:
-        print(f"❌ No cart found for user_id: {user_id}")
-        raise HTTPException(status_code=400, detail="Cart is empty")
-    
-    cart_id = str(cart["_id"])
-    print(f"✓ Found cart_id: {cart_id}")
-    
-    cart_items = await db.cart_items.find({"cart_id": cart_id}).to_list(1000)
-    
-    print(f"✓ Cart items count: {len(cart_items)}")
-    if not cart_items:
-        print(f"❌ No cart items found for cart_id: {cart_id}")
-        raise HTTPException(status_code=400, detail="Cart is empty")
-    
-    # Calculate subtotal and order items
-    subtotal = 0.0
-    order_items_list = []
-    
-    for cart_item in cart_items:
-        inventory = await db.inventory.find_one({"_id": ObjectId(cart_item["inventory_id"])})
-        if inventory:
-            item_total = float(inventory["price"]) * cart_item["quantity"]
-            subtotal += item_total
-            
-            order_items_list.append({
-                "inventory_id": cart_item["inventory_id"],
-                "price": float(inventory["price"]),
-                "quantity": cart_item["quantity"]
-            })
-    
-    # Calculate delivery charges: Rs 300 if subtotal < 2000, else free
-    delivery_charges = 300.0 if subtotal < 2000 else 0.0
-    total = subtotal + delivery_charges
-    
-    # Create order
-    order_dict = {
-        "user_id": user_id,
-        "order_time": datetime.utcnow(),
-        "payment_type": order.payment_type,
-        "status": "pending",
-        "first_name": order.first_name,
-        "last_name": order.last_name,
-        "email": order.email,
-        "phone": order.phone,
-        "address": order.address,
-        "city": order.city,
-        "zip_code": order.zip_code,
-        "subtotal": subtotal,
-        "delivery_charges": delivery_charges,
-        "total": total
-    }
-    
-    result = await db.orders.insert_one(order_dict)
-    order_id = str(result.inserted_id)
-    
-    # Create order items from cart items
-    for order_item_data in order_items_list:
-        inventory = await db.inventory.find_one({"_id": ObjectId(order_item_data["inventory_id"])})
-        
-        order_item = {
-            "order_id": order_id,
-            "inventory_id": str(order_item_data["inventory_id"]),
-            "price": float(order_item_data["price"]),
-            "quantity": int(order_item_data["quantity"]),
-            "product_name": inventory.get("name", "Product") if inventory else "Product",
-            "product_image": inventory.get("images", [None])[0] if inventory and inventory.get("images") else "https://via.placeholder.com/100"
+    # Causal session: every read below observes the writes made earlier in this checkout
+    async with causal_session() as session:
+        cart = await db.carts.find_one({"user_id": user_id}, session=session)
+
+        if not cart:
+            print(f"❌ No cart found for user_id: {user_id}")
+            raise HTTPException(status_code=400, detail="Cart is empty")
+
+        cart_id = str(cart["_id"])
+        print(f"✓ Found cart_id: {cart_id}")
+
+        cart_items = await db.cart_items.find({"cart_id": cart_id}, session=session).to_list(1000)
+
+        print(f"✓ Cart items count: {len(cart_items)}")
+        if not cart_items:
+            print(f"❌ No cart items found for cart_id: {cart_id}")
+            raise HTTPException(status_code=400, detail="Cart is empty")
+
+        # Calculate subtotal and order items
+        subtotal = 0.0
+        order_items_list = []
+
+        for cart_item in cart_items:
+            inventory = await db.inventory.find_one({"_id": ObjectId(cart_item["inventory_id"])}, session=session)
+            if inventory:
+                item_total = float(inventory["price"]) * cart_item["quantity"]
+                subtotal += item_total
+
+                order_items_list.append({
+                    "inventory_id": cart_item["inventory_id"],
+                    "price": float(inventory["price"]),
+                    "quantity": cart_item["quantity"],
+                    "category_id": inventory.get("category_id"),
+                    "subcategory_id": inventory.get("subcategory_id")
+                })
+
+        # Calculate delivery charges: Rs 300 if subtotal < 2000, else free
+        delivery_charges = 300.0 if subtotal < 2000 else 0.0
+        total = subtotal + delivery_charges
+
+        # Create order
+        order_dict = {
+            "user_id": user_id,
+            # Denormalized so admin feeds don't need a users lookup per order
+            "customer_name": current_user.get("full_name", ""),
+            "customer_email": current_user.get("email", ""),
+            "order_time": datetime.utcnow(),
+            "payment_type": order.payment_type,
+            "status": "pending",
+            "first_name": order.first_name,
+            "last_name": order.last_name,
+            "email": order.email,
+            "phone": order.phone,
+            "address": order.address,
+            "city": order.city,
+            "zip_code": order.zip_code,
+            "subtotal": subtotal,
+            "delivery_charges": delivery_charges,
+            "total": total
         }
-        result = await db.order_items.insert_one(order_item)
-        order_item["_id"] = str(result.inserted_id)
-        
-        # Update inventory stock
-        if inventory:
-            new_stock = inventory["stock"] - order_item_data["quantity"]
-            await db.inventory.update_one(
-                {"_id": ObjectId(order_item_data["inventory_id"])},
-                {"$set": {"stock": new_stock}}
-            )
-    
-    # Clear cart
-    await db.cart_items.delete_many({"cart_id": cart_id})
-    
+
+        result = await db.orders.insert_one(order_dict, session=session)
+        order_object_id = result.inserted_id
+        order_id = str(order_object_id)
+
+        # Create order items from cart items
+        for order_item_data in order_items_list:
+            inventory = await db.inventory.find_one({"_id": ObjectId(order_item_data["inventory_id"])}, session=session)
+
+            order_item = {
+                "order_id": order_id,
+                "inventory_id": str(order_item_data["inventory_id"]),
+                "price": float(order_item_data["price"]),
+                "quantity": int(order_item_data["quantity"]),
+                "product_name": inventory.get("name", "Product") if inventory else "Product",
+                "product_image": inventory.get("images", [None])[0] if inventory and inventory.get("images") else "https://via.placeholder.com/100"
+            }
+            result = await db.order_items.insert_one(order_item, session=session)
+            order_item["_id"] = str(result.inserted_id)
+
+            # Update inventory stock
+            if inventory:
+                new_stock = inventory["stock"] - order_item_data["quantity"]
+                await db.inventory.update_one(
+                    {"_id": ObjectId(order_item_data["inventory_id"])},
+                    {"$set": {"stock": new_stock}},
+                    session=session
+                )
+
+        # Clear cart
+        await db.cart_items.delete_many({"cart_id": cart_id}, session=session)
+
+        # Keep the daily sales rollup current so dashboards never scan orders.
+        # The order is committed by now: a failure here must not fail the
+        # request (a retry would place it again); the reconcile scripts repair drift.
+        try:
+            await record_order_sales(db, order_dict["order_time"], total)
+            await record_item_sales(db, order_dict["order_time"], order_items_list)
+            await record_user_order(db, user_id, order_object_id, order_dict["order_time"], total)
+        except PyMongoError as e:
+            logger.error(f"Rollup update for order {order_id} failed: {e}")
+
     order_dict["_id"] = order_id
     return OrderResponse(**order_dict)
 
@@ -158,6 +200,35 @@ async def get_all_orders(current_user: dict = Depends(get_current_user)):
     return result
 
 
+async def get_stream_user(request: Request, token: Optional[str] = None):
+    """Bearer header, or ?token= for browser EventSource which can't set headers"""
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(token)
+
+
+@router.get("/stream")
+async def stream_order_updates(request: Request, current_user: dict = Depends(get_stream_user)):
+    """Server-Sent Events: pushes `order_status` events when any of the user's orders changes status"""
+    user_id = str(current_user["_id"])
+    
+    if not order_status_broker.has_capacity(user_id, settings.SSE_MAX_CONNECTIONS_PER_USER, settings.SSE_MAX_CONNECTIONS):
+        raise HTTPException(status_code=429, detail="Too many open order streams")
+    
+    return StreamingResponse(
+        order_status_stream(request, user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{order_id}")
 async def get_order(order_id: str, current_user: dict = Depends(get_current_user)):
     db = await get_database()
@@ -208,6 +279,26 @@ async def get_order_items(order_id: str, current_user: dict = Depends(get_curren
     return result
 
 
+async def restore_cancelled_order(db, order: dict):
+    """Return a cancelled order's stock and remove it from the sales rollup, rankings and customer totals"""
+    order_id = str(order["_id"])
+    print(f"[INFO] Order {order_id} cancelled, restoring inventory stock")
+    
+    order_items = await db.order_items.find({"order_id": order_id}).to_list(1000)
+    for order_item in order_items:
+        inventory_id = order_item.get("inventory_id")
+        quantity = order_item.get("quantity", 0)
+        if inventory_id and ObjectId.is_valid(inventory_id):
+            await db.inventory.update_one({"_id": ObjectId(inventory_id)}, {"$inc": {"stock": quantity}})
+            print(f"[INFO] Restored {quantity} units to inventory {inventory_id}")
+    
+    if order.get("order_time"):
+        await record_order_sales(db, order["order_time"], order.get("total", 0.0), sign=-1)
+        await record_item_sales(db, order["order_time"], await order_ranking_items(db, order_items), sign=-1)
+        # After the status write, so the customer's last_order_time can skip this order
+        await record_user_order(db, str(order["user_id"]), order["_id"], order["order_time"], order.get("total", 0.0), sign=-1)
+
+
 @router.put("/{order_id}")
 async def update_order(
     order_id: str,
@@ -240,28 +331,6 @@ async def update_order(
             raise HTTPException(status_code=400, detail="Invalid status")
         if current_status in terminal_statuses and new_status != current_status:
             raise HTTPException(status_code=400, detail="Cannot change status after it is delivered or cancelled")
-        
-        # If order is being cancelled, restore inventory stock
-        if new_status == "cancelled" and current_status != "cancelled":
-            print(f"[INFO] Order {order_id} being cancelled, restoring inventory stock")
-            
-            # Get all order items for this order
-            order_items = await db.order_items.find({"order_id": order_id}).to_list(1000)
-            
-            # Restore stock for each item
-            for order_item in order_items:
-                inventory_id = order_item.get("inventory_id")
-                quantity = order_item.get("quantity", 0)
-                
-                if inventory_id and ObjectId.is_valid(inventory_id):
-                    inventory = await db.inventory.find_one({"_id": ObjectId(inventory_id)})
-                    if inventory:
-                        new_stock = inventory["stock"] + quantity
-                        await db.inventory.update_one(
-                            {"_id": ObjectId(inventory_id)},
-                            {"$set": {"stock": new_stock}}
-                        )
-                        print(f"[INFO] Restored {quantity} units to inventory {inventory_id}, new stock: {new_stock}")
     
     # If already terminal and no other fields to update, just return current order
     if current_status in terminal_statuses and (not update_data or (len(update_data) == 1 and "status" in update_data)):
@@ -272,13 +341,25 @@ async def update_order(
         return order_data
     
     if update_data:
-        result = await db.orders.update_one(
-            {"_id": ObjectId(order_id)},
-            {"$set": update_data}
-        )
+        status_changing = "status" in update_data and update_data["status"] != current_status
+        query = {"_id": ObjectId(order_id)}
+        if status_changing:
+            # The transition itself is the gate: of concurrent requests that read the
+            # same status only one matches, so side effects below run exactly once
+            query["status"] = order.get("status")
+        result = await db.orders.update_one(query, {"$set": update_data})
         
         if result.matched_count == 0:
+            if status_changing and await db.orders.count_documents({"_id": ObjectId(order_id)}, limit=1):
+                raise HTTPException(status_code=409, detail="Order status was changed by another request")
             raise HTTPException(status_code=404, detail="Order not found")
+        
+        if status_changing and update_data["status"] == "cancelled":
+            await restore_cancelled_order(db, order)
+        
+        # Without change streams only this worker's subscribers can be notified
+        if status_changing and not change_consumer.live:
+            order_status_broker.publish_status(str(order["user_id"]), order_id, update_data["status"])
     
     # Fetch updated order
     updated_order = await db.orders.find_one({"_id": ObjectId(order_id)})
@@ -300,13 +381,21 @@ async def delete_order(order_id: str, current_user: dict = Depends(get_current_u
     if current_user.get("role") not in ["admin", "super_user"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Delete order items first
-    await db.order_items.delete_many({"order_id": order_id})
-    
-    # Delete order
-    result = await db.orders.delete_one({"_id": ObjectId(order_id)})
+    # Deleting the order is the gate: only the request that removed it (and saw
+    # its status at that moment) reverses its totals, even against a concurrent cancel
+    deleted_order = await db.orders.find_one_and_delete({"_id": ObjectId(order_id)})
     
-    if result.deleted_count == 0:
+    if deleted_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    # Then its items, keeping what the rankings need to reverse the sale
+    order_items = await db.order_items.find({"order_id": order_id}, {"inventory_id": 1, "quantity": 1}).to_list(1000)
+    await db.order_items.delete_many({"order_id": order_id})
+    
+    # Cancelled orders were already removed from the sales rollup and rankings
+    if deleted_order.get("status") != "cancelled" and deleted_order.get("order_time"):
+        await record_order_sales(db, deleted_order["order_time"], deleted_order.get("total", 0.0), sign=-1)
+        await record_item_sales(db, deleted_order["order_time"], await order_ranking_items(db, order_items), sign=-1)
+        await record_user_order(db, str(deleted_order["user_id"]), deleted_order["_id"], deleted_order["order_time"], deleted_order.get("total", 0.0), sign=-1)
+    
     return None
@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 from bson import ObjectId
 from app.models import PetCreate, PetResponse, PetUpdate
-from app.database import get_database
+from app.database import get_database, get_catalog_database
+from app.serialization import model_response, models_response
 from app.routes.users import get_current_user
 
 router = APIRouter(prefix="/pets", tags=["Pets"])
@@ -21,18 +22,14 @@ async def create_pet(pet: PetCreate, current_user: dict = Depends(get_current_us
 
 @router.get("/", response_model=List[PetResponse])
 async def get_all_pets():
-    db = await get_database()
+    db = await get_catalog_database()
     pets = await db.pets.find().to_list(1000)
-    
-    for pet in pets:
-        pet["_id"] = str(pet["_id"])
-    
-    return [PetResponse(**pet) for pet in pets]
+    return models_response(PetResponse, pets)
 
 
 @router.get("/{pet_id}", response_model=PetResponse)
 async def get_pet(pet_id: str):
-    db = await get_database()
+    db = await get_catalog_database()
     
     if not ObjectId.is_valid(pet_id):
         raise HTTPException(status_code=400, detail="Invalid pet ID")
@@ -41,8 +38,7 @@ async def get_pet(pet_id: str):
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
     
-    pet["_id"] = str(pet["_id"])
-    return PetResponse(**pet)
+    return model_response(PetResponse, pet)
 
 
 @router.put("/{pet_id}", response_model=PetResponse)
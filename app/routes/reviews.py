@@ -0,0 +1,118 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from typing import List, Optional
+from bson import ObjectId
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from app.models import ReviewCreate, ReviewResponse, ReviewUpdate
+from app.database import get_database, get_catalog_database
+from app.reviews import apply_review_delta
+from app.serialization import models_response
+from app.routes.users import get_current_user
+
+router = APIRouter(prefix="/reviews", tags=["Reviews"])
+
+
+@router.post("/inventory/{inventory_id}", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
+async def create_review(inventory_id: str, review: ReviewCreate, current_user: dict = Depends(get_current_user)):
+    db = await get_database()
+
+    if current_user.get("status") == "banned":
+        raise HTTPException(status_code=403, detail="Your account has been banned. You cannot post reviews.")
+
+    if not ObjectId.is_valid(inventory_id):
+        raise HTTPException(status_code=400, detail="Invalid inventory ID")
+
+    if not await db.inventory.find_one({"_id": ObjectId(inventory_id)}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Inventory item not found")
+
+    review_dict = review.dict()
+    review_dict.update({
+        "inventory_id": inventory_id,
+        "user_id": str(current_user["_id"]),
+        "username": current_user.get("username", ""),
+        "created_at": datetime.utcnow(),
+        "updated_at": None
+    })
+
+    try:
+        result = await db.reviews.insert_one(review_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="You have already reviewed this item")
+
+    await apply_review_delta(db, inventory_id, review.rating, 1)
+
+    review_dict["_id"] = str(result.inserted_id)
+    return ReviewResponse(**review_dict)
+
+
+@router.get("/inventory/{inventory_id}", response_model=List[ReviewResponse])
+async def get_inventory_reviews(
+    inventory_id: str,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Newest reviews first. Pass the X-Next-Cursor response header back as `cursor` for the next page."""
+    db = await get_catalog_database()
+
+    query = {"inventory_id": inventory_id}
+    if cursor:
+        if not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["_id"] = {"$lt": ObjectId(cursor)}
+
+    reviews = await db.reviews.find(query).sort("_id", -1).limit(limit).to_list(limit)
+
+    result = models_response(ReviewResponse, reviews)
+    if len(reviews) == limit:
+        result.headers["X-Next-Cursor"] = str(reviews[-1]["_id"])
+    return result
+
+
+@router.put("/{review_id}", response_model=ReviewResponse)
+async def update_review(review_id: str, review_update: ReviewUpdate, current_user: dict = Depends(get_current_user)):
+    db = await get_database()
+
+    if not ObjectId.is_valid(review_id):
+        raise HTTPException(status_code=400, detail="Invalid review ID")
+
+    update_data = review_update.dict(exclude_unset=True)
+    if update_data.get("rating") is None:
+        update_data.pop("rating", None)
+    update_data["updated_at"] = datetime.utcnow()
+
+    # The pre-update document gives the exact rating delta even under concurrent edits
+    previous = await db.reviews.find_one_and_update(
+        {"_id": ObjectId(review_id), "user_id": str(current_user["_id"])},
+        {"$set": update_data}
+    )
+    if not previous:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    if "rating" in update_data and update_data["rating"] != previous["rating"]:
+        await apply_review_delta(db, previous["inventory_id"], update_data["rating"] - previous["rating"], 0)
+
+    review = {**previous, **update_data}
+    review["_id"] = str(review["_id"])
+    return ReviewResponse(**review)
+
+
+@router.delete("/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_review(review_id: str, current_user: dict = Depends(get_current_user)):
+    db = await get_database()
+
+    if not ObjectId.is_valid(review_id):
+        raise HTTPException(status_code=400, detail="Invalid review ID")
+
+    # Owners delete their own reviews; admins can moderate any review
+    query = {"_id": ObjectId(review_id)}
+    if current_user.get("role") not in ["admin", "super_user"]:
+        query["user_id"] = str(current_user["_id"])
+
+    review = await db.reviews.find_one_and_delete(query)
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    await apply_review_delta(db, review["inventory_id"], -review["rating"], -1)
+
+    return None
@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 from bson import ObjectId
 from app.models import SubcategoryCreate, SubcategoryResponse, SubcategoryUpdate
-from app.database import get_database
+from app.database import get_database, get_catalog_database
+from app.serialization import models_response
 from app.routes.users import get_current_user
 
 router = APIRouter(prefix="/subcategories", tags=["Subcategories"])
@@ -16,29 +17,21 @@ async def verify_admin(current_user: dict = Depends(get_current_user)):
 
 @router.get("/", response_model=List[SubcategoryResponse])
 async def get_all_subcategories():
-    db = await get_database()
+    db = await get_catalog_database()
     
     subcategories = await db.subcategories.find().to_list(1000)
-    
-    for sub in subcategories:
-        sub["_id"] = str(sub["_id"])
-    
-    return [SubcategoryResponse(**sub) for sub in subcategories]
+    return models_response(SubcategoryResponse, subcategories)
 
 
 @router.get("/category/{category_id}", response_model=List[SubcategoryResponse])
 async def get_subcategories_by_category(category_id: str):
-    db = await get_database()
+    db = await get_catalog_database()
     
     if not ObjectId.is_valid(category_id):
         raise HTTPException(status_code=400, detail="Invalid category ID")
     
     subcategories = await db.subcategories.find({"category_id": category_id}).to_list(1000)
-    
-    for sub in subcategories:
-        sub["_id"] = str(sub["_id"])
-    
-    return [SubcategoryResponse(**sub) for sub in subcategories]
+    return models_response(SubcategoryResponse, subcategories)
 
 
 @router.post("/", response_model=SubcategoryResponse, status_code=status.HTTP_201_CREATED)
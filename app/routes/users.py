@@ -1,19 +1,31 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from typing import List
-from datetime import datetime, timedelta
+from datetime import datetime
 from bson import ObjectId
 import base64
 import json
+import logging
 from pydantic import BaseModel
 from app.models import (
     UserCreate, UserResponse, UserUpdate, Token, LoginRequest, ChangePasswordRequest, 
     ForgotPasswordRequest, ResetPasswordRequest
 )
 from app.database import get_database
-from app.auth import get_password_hash, verify_password, create_access_token, verify_token
-from app.database import settings
+from app.sessions import (
+    USER_CACHE_PROJECTION, user_cache, revocation_filter,
+    issue_tokens, rotate_refresh_token, revoke_session, revoke_user, user_changed
+)
+from app.auth import get_password_hash, verify_password, verify_token
+from app.denormalization import enqueue_user_fanout
+from app.cascade import enqueue_cascade
 from app.email import send_password_reset_email, verify_reset_token
+from app.rate_limit import (
+    rate_limiter, LOGIN_PER_IP, LOGIN_PER_ACCOUNT, REGISTER_PER_IP,
+    FORGOT_PASSWORD_PER_IP, FORGOT_PASSWORD_PER_ACCOUNT
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/users", tags=["Users"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
@@ -46,20 +58,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     payload = verify_token(token)
-    if payload is None:
+    if payload is None or payload.get("type", "access") != "access":
         raise credentials_exception
-    username: str = payload.get("sub")
-    if username is None:
+    # Logouts, bans and password changes take effect here, without a DB read
+    if revocation_filter.is_revoked(payload):
         raise credentials_exception
-    
-    db = await get_database()
-    user = await db.users.find_one({"username": username})
+
+    user_id = payload.get("uid")
+    if user_id:
+        user = user_cache.get(user_id)
+        if user is None and ObjectId.is_valid(user_id):
+            db = await get_database()
+            user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_CACHE_PROJECTION)
+            if user is not None:
+                user_cache.put(user_id, user)
+    else:
+        # Tokens issued before sessions existed only carry the username
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+        db = await get_database()
+        user = await db.users.find_one({"username": username})
     if user is None:
         raise credentials_exception
     return user
 
 
-@router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+@router.post(
+    "/register", response_model=Token, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limiter.per_ip(REGISTER_PER_IP))]
+)
 async def register_user(user: UserCreate):
     db = await get_database()
     
@@ -85,16 +117,13 @@ async def register_user(user: UserCreate):
     
     result = await db.users.insert_one(user_dict)
     user_id = str(result.inserted_id)
+    user_dict["_id"] = result.inserted_id
     
-    # Create access token for auto-login after registration
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    # Create tokens for auto-login after registration
+    tokens = await issue_tokens(db, user_dict)
     
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
+        **tokens,
         "user": {
             "_id": user_id,
             "username": user.username,
@@ -105,7 +134,7 @@ async def register_user(user: UserCreate):
     }
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(rate_limiter.per_ip(LOGIN_PER_IP))])
 async def login(login_data: LoginRequest):
     db = await get_database()
     
@@ -135,6 +164,9 @@ async def login(login_data: LoginRequest):
             detail="Email and password are required",
         )
     
+    # Throttle per account before any bcrypt work
+    await rate_limiter.enforce(LOGIN_PER_ACCOUNT, email.lower())
+    
     # Find user by email
     user = await db.users.find_one({"email": email.lower()})
     
@@ -166,20 +198,12 @@ async def login(login_data: LoginRequest):
         {"$set": {"last_login_time": datetime.utcnow()}}
     )
     
-    # Admin/super_user gets 2 hours token expiry, regular users get default
-    if user.get("role") in ["admin", "super_user"]:
-        access_token_expires = timedelta(minutes=120)  # 2 hours for admins
-    else:
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    access_token = create_access_token(
-        data={"sub": user["username"]}, expires_delta=access_token_expires
-    )
+    # Short-lived access token; clients renew it with the refresh token
+    tokens = await issue_tokens(db, user)
     
     # Prepare response data
     response_data = {
-        "access_token": access_token, 
-        "token_type": "bearer",
+        **tokens,
         "user": {
             "_id": str(user["_id"]),
             "username": user["username"],
@@ -198,7 +222,7 @@ async def login(login_data: LoginRequest):
     }
 
 
-@router.post("/login-plain")
+@router.post("/login-plain", dependencies=[Depends(rate_limiter.per_ip(LOGIN_PER_IP))])
 async def login_plain(login_data: LoginRequest):
     """Temporary endpoint for testing without encryption"""
     db = await get_database()
@@ -212,6 +236,9 @@ async def login_plain(login_data: LoginRequest):
             detail="Email and password are required",
         )
     
+    # Throttle per account before any bcrypt work
+    await rate_limiter.enforce(LOGIN_PER_ACCOUNT, email.lower())
+    
     # Find user by email
     user = await db.users.find_one({"email": email.lower()})
     
@@ -234,19 +261,11 @@ async def login_plain(login_data: LoginRequest):
         {"$set": {"last_login_time": datetime.utcnow()}}
     )
     
-    # Admin/super_user gets 2 hours token expiry, regular users get default
-    if user.get("role") in ["admin", "super_user"]:
-        access_token_expires = timedelta(minutes=120)  # 2 hours for admins
-    else:
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    access_token = create_access_token(
-        data={"sub": user["username"]}, expires_delta=access_token_expires
-    )
+    # Short-lived access token; clients renew it with the refresh token
+    tokens = await issue_tokens(db, user)
     
     return {
-        "access_token": access_token, 
-        "token_type": "bearer",
+        **tokens,
         "user": {
             "_id": str(user["_id"]),
             "username": user["username"],
@@ -258,6 +277,33 @@ async def login_plain(login_data: LoginRequest):
     }
 
 
+@router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshRequest):
+    """Exchange a refresh token for a new access token and refresh token"""
+    db = await get_database()
+    
+    result = await rotate_refresh_token(db, request.refresh_token)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    _, tokens = result
+    return tokens
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: str = Depends(oauth2_scheme)):
+    """End the session this access token belongs to, in every worker"""
+    payload = verify_token(token)
+    if payload and payload.get("sid"):
+        db = await get_database()
+        await revoke_session(db, payload["sid"])
+    return None
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     current_user["_id"] = str(current_user["_id"])
@@ -271,8 +317,9 @@ async def get_all_users(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Not authorized. Admin access required.")
     
     db = await get_database()
-    # Only fetch regular users, exclude admin and super_user
-    users = await db.users.find({"role": "user"}).to_list(1000)
+    # Only fetch regular users, exclude admin and super_user. Avatars are not part of
+    # UserResponse; the paginated, searchable listing is GET /admin/users.
+    users = await db.users.find({"role": "user"}, {"avatar": 0, "password_hash": 0}).to_list(1000)
     
     for user in users:
         user["_id"] = str(user["_id"])
@@ -325,6 +372,18 @@ async def update_user(
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        
+        # A ban logs the user out everywhere at once; other changes only refresh cached copies
+        if update_data.get("status") == "banned" and existing_user.get("status") != "banned":
+            await revoke_user(db, user_id)
+        else:
+            await user_changed(db, user_id)
+        
+        # Copies of username / full_name / email elsewhere are rewritten in the background
+        changed_fields = [k for k, v in update_data.items() if existing_user.get(k) != v]
+        job_id = await enqueue_user_fanout(db, user_id, changed_fields)
+        if job_id:
+            logger.info(f"Queued denormalization job {job_id} for user {user_id}: {changed_fields}")
     
     # Get updated user
     user = await db.users.find_one({"_id": ObjectId(user_id)})
@@ -340,11 +399,20 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
     if not ObjectId.is_valid(user_id):
         raise HTTPException(status_code=400, detail="Invalid user ID")
     
+    # Check if user is admin; deletion also cascades to the user's carts, wishlist and profiles
+    if current_user.get("role") not in ["super_user", "admin"]:
+        raise HTTPException(status_code=403, detail="Only admin can delete users")
+    
     result = await db.users.delete_one({"_id": ObjectId(user_id)})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    await revoke_user(db, user_id)
+    # Carts, wishlist, pet profiles and counters go in the background; reviews are anonymized
+    job_id = await enqueue_cascade(db, "user", user_id)
+    logger.info(f"Queued cascade job {job_id} for deleted user {user_id}")
+    
     return None
 
 
@@ -383,14 +451,21 @@ async def change_password(
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return {"message": "Password changed successfully"}
+    # Sign out every other session; this client continues with the new tokens
+    await revoke_user(db, str(current_user["_id"]))
+    tokens = await issue_tokens(db, current_user)
+    
+    return {"message": "Password changed successfully", **tokens}
 
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=[Depends(rate_limiter.per_ip(FORGOT_PASSWORD_PER_IP))])
 async def forgot_password(request: ForgotPasswordRequest):
     """Send password reset email to user"""
     db = await get_database()
     
+    # Throttle per account so one address can't be flooded with reset emails
+    await rate_limiter.enforce(FORGOT_PASSWORD_PER_ACCOUNT, request.email.lower())
+    
     # Check if user exists
     user = await db.users.find_one({"email": request.email.lower()})
     if not user:
@@ -432,6 +507,8 @@ async def reset_password(request: ResetPasswordRequest):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    await revoke_user(db, str(user["_id"]))
+    
     return {"message": "Password reset successfully"}
 
 
@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import Iterable, List, Type
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+import orjson
+
+
+def _default(obj):
+    """orjson fallback for types it doesn't handle natively (datetime is native)"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json", by_alias=True)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson-backed JSON response that also accepts pre-serialized bytes"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp) -> TypeAdapter:
+    """Build each TypeAdapter once; constructing them compiles a schema"""
+    return TypeAdapter(tp)
+
+
+def construct(model: Type[BaseModel], document: dict) -> BaseModel:
+    """Build a response model from a trusted DB document without validating it"""
+    if "_id" in document and not isinstance(document["_id"], str):
+        document["_id"] = str(document["_id"])
+    return model.model_construct(**document)
+
+
+def dump_model(model: Type[BaseModel], document: dict) -> bytes:
+    return type_adapter(model).dump_json(construct(model, document), by_alias=True, warnings=False)
+
+
+def dump_models(model: Type[BaseModel], documents: Iterable[dict]) -> bytes:
+    items = [construct(model, document) for document in documents]
+    return type_adapter(List[model]).dump_json(items, by_alias=True, warnings=False)
+
+
+def model_response(model: Type[BaseModel], document: dict, status_code: int = 200) -> FastJSONResponse:
+    """Serialize one trusted document straight to a response, skipping response_model re-validation"""
+    return FastJSONResponse(dump_model(model, document), status_code=status_code)
+
+
+def models_response(model: Type[BaseModel], documents: Iterable[dict]) -> FastJSONResponse:
+    """Serialize a list of trusted documents in one pass, skipping response_model re-validation"""
+    return FastJSONResponse(dump_models(model, documents))
@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import logging
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from app.auth import create_access_token
+from app.database import settings, get_database
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKENS_COLLECTION = "refresh_tokens"
+REVOCATIONS_COLLECTION = "token_revocations"
+
+# The user document minus fields too large to keep in memory per user
+USER_CACHE_PROJECTION = {"avatar": 0}
+
+
+def access_token_lifetime() -> timedelta:
+    return timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+# ============= IN-MEMORY STATE =============
+
+class UserCache:
+    """Bounded TTL cache of user documents by id, so authentication needs no users read"""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # user_id -> (user, cached_at)
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+        user, cached_at = entry
+        if time.monotonic() - cached_at > self.ttl_seconds:
+            del self.entries[user_id]
+            return None
+        self.entries.move_to_end(user_id)
+        return dict(user)  # Routes modify current_user (e.g. /me stringifies _id)
+
+    def put(self, user_id: str, user: dict):
+        if self.max_size <= 0:
+            return
+        self.entries[user_id] = (dict(user), time.monotonic())
+        self.entries.move_to_end(user_id)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def evict(self, user_id: str):
+        self.entries.pop(user_id, None)
+
+
+class RevocationFilter:
+    """
+    Revoked sessions and per-user "tokens issued before" times, held in every
+    worker so checking an access token is two dict lookups. Revocations are
+    also written to token_revocations, which each worker polls every
+    REVOCATION_SYNC_SECONDS. Entries are dropped once every access token they
+    could match has expired anyway.
+    """
+
+    def __init__(self, user_cache: UserCache):
+        self.user_cache = user_cache
+        self.sessions = {}  # session id -> expires (timestamp)
+        self.users = {}     # user id -> (not_before, expires) timestamps
+        self.synced_at = None
+
+    def is_revoked(self, claims: dict) -> bool:
+        session_id = claims.get("sid")
+        if session_id is not None and session_id in self.sessions:
+            return True
+        revoked = self.users.get(claims.get("uid"))
+        return revoked is not None and claims.get("iat", 0) < revoked[0]
+
+    def apply(self, entry: dict):
+        """Apply one revocation; applying the same entry twice is harmless"""
+        kind, value = entry["kind"], entry["value"]
+        expires = entry["expires_at"].timestamp() if isinstance(entry["expires_at"], datetime) else entry["expires_at"]
+        if kind == "session":
+            self.sessions[value] = expires
+        elif kind == "user":
+            not_before, _ = self.users.get(value, (0.0, 0.0))
+            self.users[value] = (max(not_before, entry["not_before"]), expires)
+        if kind in ("user", "user_changed"):
+            self.user_cache.evict(value)
+
+    def prune(self):
+        now = time.time()
+        self.sessions = {key: expires for key, expires in self.sessions.items() if expires > now}
+        self.users = {key: value for key, value in self.users.items() if value[1] > now}
+
+    async def sync(self, db, overlap_seconds: int = 5):
+        """
+        Apply revocations written since the last sync (by any worker). The
+        window overlaps the previous one because ObjectIds from different
+        processes are not strictly ordered within a second.
+        """
+        started = datetime.utcnow()
+        if self.synced_at is None:
+            query = {"expires_at": {"$gt": started}}
+        else:
+            query = {"_id": {"$gte": ObjectId.from_datetime(self.synced_at - timedelta(seconds=overlap_seconds))}}
+        async for entry in db[REVOCATIONS_COLLECTION].find(query):
+            self.apply(entry)
+        self.synced_at = started
+        self.prune()
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+revocation_filter = RevocationFilter(user_cache)
+
+
+async def publish_revocation(db, kind: str, value: str, not_before: float = None):
+    """Apply a revocation in this worker now and record it for the others"""
+    entry = {
+        "kind": kind,
+        "value": value,
+        "not_before": not_before,
+        # An access token lives at most this long, so the entry is useless afterwards
+        "expires_at": datetime.utcnow() + access_token_lifetime() + timedelta(minutes=1),
+    }
+    revocation_filter.apply(entry)
+    await db[REVOCATIONS_COLLECTION].insert_one(entry)
+
+
+async def revocation_sync_loop():
+    while True:
+        try:
+            db = await get_database()
+            await revocation_filter.sync(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Token revocation sync failed: {e}")
+        await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+
+
+# ============= TOKENS =============
+
+async def issue_tokens(db, user: dict, session_id: str = None) -> dict:
+    """
+    A short-lived access token plus a refresh token. A login starts a new
+    session; refreshing keeps the session id so the whole chain can be
+    revoked at once.
+    """
+    user_id = str(user["_id"])
+    session_id = session_id or uuid.uuid4().hex
+    refresh_token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+
+    await db[REFRESH_TOKENS_COLLECTION].insert_one({
+        "_id": hash_refresh_token(refresh_token),
+        "user_id": user_id,
+        "session_id": session_id,
+        "created_at": now,
+        "expires_at": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        "rotated_at": None
+    })
+
+    access_token = create_access_token(
+        data={"sub": user["username"], "uid": user_id, "sid": session_id, "iat": time.time(), "type": "access"},
+        expires_delta=access_token_lifetime()
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": int(access_token_lifetime().total_seconds())
+    }
+
+
+async def rotate_refresh_token(db, refresh_token: str):
+    """
+    Exchange a refresh token for a new token pair, or return None. Each
+    refresh token works once; presenting an already rotated one (outside a
+    short grace period for concurrent refreshes) means it leaked, so the whole
+    session is revoked.
+    """
+    token_hash = hash_refresh_token(refresh_token)
+    now = datetime.utcnow()
+    record = await db[REFRESH_TOKENS_COLLECTION].find_one_and_update(
+        {"_id": token_hash, "rotated_at": None, "expires_at": {"$gt": now}},
+        {"$set": {"rotated_at": now}}
+    )
+    if record is None:
+        reused = await db[REFRESH_TOKENS_COLLECTION].find_one({"_id": token_hash})
+        if reused is not None and reused.get("rotated_at") is not None:
+            if now - reused["rotated_at"] > timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+                logger.warning(f"Refresh token reuse for user {reused['user_id']}; revoking session")
+                await revoke_session(db, reused["session_id"])
+        return None
+
+    user = await db.users.find_one({"_id": ObjectId(record["user_id"])}) if ObjectId.is_valid(record["user_id"]) else None
+    if user is None or user.get("status") == "banned":
+        await revoke_session(db, record["session_id"])
+        return None
+    return user, await issue_tokens(db, user, session_id=record["session_id"])
+
+
+async def revoke_session(db, session_id: str):
+    """Log out one session: its refresh tokens stop working and its access tokens are rejected"""
+    await db[REFRESH_TOKENS_COLLECTION].delete_many({"session_id": session_id})
+    await publish_revocation(db, "session", session_id)
+
+
+async def revoke_user(db, user_id: str):
+    """Log a user out everywhere (ban, password change, deletion)"""
+    await db[REFRESH_TOKENS_COLLECTION].delete_many({"user_id": user_id})
+    await publish_revocation(db, "user", user_id, not_before=time.time())
+
+
+async def user_changed(db, user_id: str):
+    """Drop the user's cached document in every worker without logging them out"""
+    await publish_revocation(db, "user_changed", user_id)
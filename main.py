@@ -1,12 +1,54 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import connect_to_mongo, close_mongo_connection
-from app.routes import users, pets, categories, subcategories, inventory, cart, orders, pet_profiles, wishlist, admin
+from app.serialization import FastJSONResponse
+from app.compression import CompressionMiddleware
+from app.events import start_event_consumers, stop_event_consumers
+from app.maintenance import guest_cleanup_loop
+from app.recommendations import recommendations_loop
+from app.personalization import personalized_feed_loop
+from app.sessions import revocation_sync_loop
+from app.denormalization import fanout_jobs
+from app.cascade import cascade_jobs
+from app.health import loop_lag_monitor, startup_warm_up
+from app.routes import users, pets, categories, subcategories, inventory, cart, orders, pet_profiles, wishlist, admin, reviews, health
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once per worker process: each worker owns its own Mongo pool.
+    # Warm-up runs in the background; /health/ready reports 503 until it is done.
+    await connect_to_mongo(prepare=False)
+    lag_task = asyncio.create_task(loop_lag_monitor.run())
+    warm_up_task = asyncio.create_task(startup_warm_up())
+    await start_event_consumers()
+    guest_cleanup_task = asyncio.create_task(guest_cleanup_loop())
+    recommendations_task = asyncio.create_task(recommendations_loop())
+    feed_task = asyncio.create_task(personalized_feed_loop())
+    revocation_task = asyncio.create_task(revocation_sync_loop())
+    denormalization_task = asyncio.create_task(fanout_jobs.run())
+    cascade_task = asyncio.create_task(cascade_jobs.run())
+    yield
+    cascade_task.cancel()
+    denormalization_task.cancel()
+    revocation_task.cancel()
+    warm_up_task.cancel()
+    lag_task.cancel()
+    guest_cleanup_task.cancel()
+    recommendations_task.cancel()
+    feed_task.cancel()
+    await stop_event_consumers()
+    await close_mongo_connection()
+
 
 app = FastAPI(
     title="PawStore Backend API",
     description="Backend API for PawStore application with FastAPI and MongoDB",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS configuration - Add this BEFORE other middleware
@@ -16,18 +58,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
+    # Paginated listings return their cursor in a header; browsers hide it unless exposed
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
     max_age=3600,
 )
 
-
-@app.on_event("startup")
-async def startup_db_client():
-    await connect_to_mongo()
-
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    await close_mongo_connection()
+# Compress large JSON lists (inventory, orders, guest carts) for clients that accept it
+app.add_middleware(CompressionMiddleware)
 
 
 @app.get("/")
@@ -41,6 +78,7 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Kept for existing checks; use /health/live and /health/ready"""
     return {"status": "healthy"}
 
 
@@ -55,6 +93,8 @@ app.include_router(orders.router)
 app.include_router(pet_profiles.router)
 app.include_router(wishlist.router)
 app.include_router(admin.router)
+app.include_router(reviews.router)
+app.include_router(health.router)
 
 
 if __name__ == "__main__":
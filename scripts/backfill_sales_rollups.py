@@ -0,0 +1,39 @@
+"""
+Rebuild the daily sales rollup (`sales_daily`) from the `orders` collection.
+
+Run once after deploying the analytics endpoint, or any time the rollup is
+suspected to have drifted. Reads orders in batches and swaps the rebuilt
+rollup in at the end.
+
+Usage:
+    python scripts/backfill_sales_rollups.py --batch-size 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.analytics import rebuild_daily_sales
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        started = time.perf_counter()
+        processed = await rebuild_daily_sales(db, args.batch_size)
+        print(f"Rebuilt sales rollup from {processed} orders in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
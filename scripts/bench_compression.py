@@ -0,0 +1,63 @@
+"""
+Measure bytes saved and CPU spent compressing a 1000-item inventory response
+with gzip and brotli at several levels.
+
+No database needed; documents are synthetic (same generator as
+bench_serialization.py).
+
+Usage:
+    python scripts/bench_compression.py --items 1000 --rounds 50
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_serialization import make_documents
+from app.models import InventoryResponse
+from app.serialization import dump_models
+from app.compression import COMPRESSION_LEVELS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def measure(label, fn, body, rounds):
+    started = time.process_time()
+    for _ in range(rounds):
+        compressed = fn(body)
+    cpu_ms = (time.process_time() - started) / rounds * 1000
+    saved = len(body) - len(compressed)
+    print(f"{label:<16} {len(compressed):>10} {saved / len(body) * 100:>8.1f}% {cpu_ms:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    body = dump_models(InventoryResponse, make_documents(args.items))
+    default_gzip, default_brotli = COMPRESSION_LEVELS["application/json"]
+
+    print(f"{args.items} inventory items, uncompressed {len(body)} bytes, {args.rounds} rounds\n")
+    print(f"{'encoding':<16} {'bytes':>10} {'saved':>9} {'cpu ms':>10}")
+    for level in (1, 4, default_gzip, 9):
+        marker = "*" if level == default_gzip else ""
+        measure(f"gzip -{level}{marker}", lambda b, l=level: gzip.compress(b, compresslevel=l), body, args.rounds)
+    if brotli is None:
+        print("brotli not installed: pip install Brotli")
+    else:
+        for quality in (1, 4, default_brotli, 11):
+            marker = "*" if quality == default_brotli else ""
+            measure(f"br q{quality}{marker}", lambda b, q=quality: brotli.compress(b, quality=q), body, args.rounds)
+    print("\n* level used by CompressionMiddleware for application/json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark the effect of MongoDB connection pool size on throughput.
+
+Runs a fixed number of concurrent find_one() calls against a local mongod for
+several pool sizes and prints ops/sec and latency percentiles for each.
+
+Usage:
+    python scripts/bench_mongo_pool.py --pool-sizes 5,10,50,100 --concurrency 200 --ops 20000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.database import settings, mongo_client_options, warm_up_pool, redact_mongo_url
+
+
+async def run_once(pool_size: int, concurrency: int, total_ops: int, collection_name: str):
+    options = mongo_client_options()
+    options["maxPoolSize"] = pool_size
+    options["minPoolSize"] = min(options["minPoolSize"], pool_size)
+    client = AsyncIOMotorClient(settings.MONGODB_URL, **options)
+    collection = client[settings.DATABASE_NAME][collection_name]
+
+    await warm_up_pool(client, options["minPoolSize"])
+
+    latencies = []
+    remaining = total_ops
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await collection.find_one({"n": remaining % 1000})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    client.close()
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "pool": pool_size,
+        "ops_per_sec": len(latencies) / elapsed,
+        "p50": q[49],
+        "p95": q[94],
+        "p99": q[98],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-sizes", default="5,10,25,50,100")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--collection", default="bench_pool")
+    args = parser.parse_args()
+
+    # Seed a small indexed collection so the benchmark measures pool behaviour, not scans
+    client = AsyncIOMotorClient(settings.MONGODB_URL, **mongo_client_options())
+    collection = client[settings.DATABASE_NAME][args.collection]
+    await collection.drop()
+    await collection.insert_many([{"n": i, "payload": "x" * 256} for i in range(1000)])
+    await collection.create_index("n")
+    client.close()
+
+    print(f"MongoDB: {redact_mongo_url(settings.MONGODB_URL)}")
+    print(f"Concurrency: {args.concurrency}, ops per run: {args.ops}\n")
+    print(f"{'pool':>6} {'ops/sec':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    for pool_size in [int(p) for p in args.pool_sizes.split(",")]:
+        r = await run_once(pool_size, args.concurrency, args.ops, args.collection)
+        print(f"{r['pool']:>6} {r['ops_per_sec']:>10.0f} {r['p50']:>8.2f} {r['p95']:>8.2f} {r['p99']:>8.2f}")
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    await client[settings.DATABASE_NAME][args.collection].drop()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark serializing 1000 inventory documents: the old per-item
+InventoryResponse(**item) + response_model re-validation + json.dumps path
+versus the model_construct + cached TypeAdapter + orjson path.
+
+No database needed; documents are synthetic.
+
+Usage:
+    python scripts/bench_serialization.py --items 1000 --rounds 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from app.models import InventoryResponse
+from app.serialization import dump_models, type_adapter
+
+
+def make_documents(count: int):
+    return [{
+        "_id": ObjectId(),
+        "name": f"Product {i}",
+        "description": "Premium pet product with a reasonably long marketing description.",
+        "price": 1299.5 + i,
+        "stock": 25,
+        "category_id": str(ObjectId()),
+        "subcategory_id": str(ObjectId()),
+        "images": [f"https://cdn.example.com/p{i}-1.jpg", f"https://cdn.example.com/p{i}-2.jpg"],
+        "weight": "2kg",
+        "brand": "PawBrand",
+        "age_range": "adult",
+        "rating": 4.5,
+        "num_reviews": 120,
+        "discount": 10.0,
+        "is_visible": True,
+    } for i in range(count)]
+
+
+def before(documents) -> bytes:
+    # What the handler + FastAPI used to do for List[InventoryResponse]
+    for item in documents:
+        item["_id"] = str(item["_id"])
+    models = [InventoryResponse(**item) for item in documents]
+    validated = type_adapter(List[InventoryResponse]).validate_python(models, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated, by_alias=True)).encode("utf-8")
+
+
+def after(documents) -> bytes:
+    return dump_models(InventoryResponse, documents)
+
+
+def bench(fn, count, rounds):
+    # Fresh documents each round: the old path mutated _id in place
+    batches = [make_documents(count) for _ in range(rounds)]
+    started = time.perf_counter()
+    for documents in batches:
+        body = fn(documents)
+    elapsed = time.perf_counter() - started
+    return elapsed / rounds * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    # Both paths must produce the same JSON
+    sample = make_documents(3)
+    assert json.loads(before([dict(d) for d in sample])) == json.loads(after([dict(d) for d in sample]))
+
+    old_ms, old_bytes = bench(before, args.items, args.rounds)
+    new_ms, new_bytes = bench(after, args.items, args.rounds)
+
+    print(f"{args.items} inventory items, {args.rounds} rounds")
+    print(f"{'path':<32} {'ms/response':>12} {'bytes':>10}")
+    print(f"{'validate + re-validate + json':<32} {old_ms:>12.2f} {old_bytes:>10}")
+    print(f"{'model_construct + orjson':<32} {new_ms:>12.2f} {new_bytes:>10}")
+    print(f"speedup: {old_ms / new_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
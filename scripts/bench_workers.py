@@ -0,0 +1,104 @@
+"""
+Benchmark serve.py with 1 worker versus N workers.
+
+Starts the production server as a subprocess for each worker count, drives
+GET requests with concurrent clients for a fixed duration, prints req/s and
+latency percentiles, then stops the server with SIGTERM (exercising the
+graceful drain).
+
+Usage:
+    python scripts/bench_workers.py --workers 1,4 --path /inventory/ --concurrency 100 --duration 20
+
+Requires httpx (`pip install httpx`) and a reachable MongoDB from .env.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("httpx is required for this benchmark: pip install httpx")
+
+
+async def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not come up within {timeout}s")
+
+
+async def drive(base_url: str, path: str, concurrency: int, duration: float):
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def user():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[user() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+async def bench(workers: int, args):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), SERVER_PORT=str(args.port))
+    server = subprocess.Popen([sys.executable, "serve.py"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_until_up(base_url)
+        # Short warm-up so pools and caches are hot in every worker
+        await drive(base_url, args.path, args.concurrency, 2)
+        latencies, errors, elapsed = await drive(base_url, args.path, args.concurrency, args.duration)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    q = statistics.quantiles(sorted(latencies), n=100)
+    return {"workers": workers, "rps": len(latencies) / elapsed, "p50": q[49], "p99": q[98], "errors": errors}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}")
+    parser.add_argument("--path", default="/inventory/")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    print(f"GET {args.path}, {args.concurrency} concurrent clients, {args.duration:.0f}s per run\n")
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        r = await bench(workers, args)
+        print(f"{r['workers']:>8} {r['rps']:>10.0f} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+Bulk create/update inventory from a supplier feed (CSV or NDJSON), using the
+same validation and batched upserts as `POST /inventory/import`.
+
+CSV files need a header row with InventoryCreate field names; `images` may be
+a "|"-separated list. Rows are matched on --key (sku or name).
+
+Usage:
+    python scripts/import_inventory.py feed.csv --key sku
+    python scripts/import_inventory.py feed.ndjson --key name --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.inventory_import import IMPORT_FORMATS, IMPORT_KEYS, iter_rows, import_inventory
+
+
+async def read_chunks(path: str, size: int = 256 * 1024):
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, size)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--key", choices=IMPORT_KEYS, default="sku")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--ordered", action="store_true", help="Stop at the first failed write")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only")
+    parser.add_argument("--max-errors", type=int, default=50, help="Failed rows to print")
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        started = time.perf_counter()
+        report = await import_inventory(
+            db,
+            iter_rows(read_chunks(args.path), file_format),
+            key=args.key,
+            ordered=args.ordered,
+            dry_run=args.dry_run,
+            batch_size=args.batch_size,
+            max_errors=args.max_errors
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        await close_mongo_connection()
+
+    for error in report["errors"]:
+        print(f"row {error['row']}: {'; '.join(error['errors'])}")
+    if report["errors_truncated"]:
+        print(f"... {report['failed'] - len(report['errors'])} more failed rows")
+    if report["stopped_at_row"]:
+        print(f"Stopped at row {report['stopped_at_row']}")
+    print(
+        f"{report['rows']} rows in {elapsed:.1f}s ({report['rows'] / elapsed:,.0f} rows/s): "
+        f"{report['valid']} valid, {report['failed']} failed, "
+        f"{report['upserted']} created, {report['modified']} updated"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
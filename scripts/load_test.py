@@ -0,0 +1,353 @@
+"""
+Load-test harness with weighted shopper scenarios.
+
+Seeds a MongoDB database with synthetic users, categories and inventory, then
+drives the API with concurrent virtual users picking scenarios by weight:
+
+    browse          categories -> inventory by category -> product page
+    add_to_cart     product page -> POST /cart/items
+    guest_sync      POST /cart/{guest_id}/sync -> GET /cart/{guest_id}
+    checkout        POST /cart/items -> POST /orders/
+    admin           dashboard stats -> recent orders
+
+By default the app runs in-process over ASGI (no network, no uvicorn). Pass
+--base-url to target a running server instead; the server must use the same
+SECRET_KEY and the database given by --database.
+
+Reports throughput, p50/p95/p99 per endpoint and MongoDB commands per request.
+Commands per endpoint are measured in a separate single-user profiling pass so
+concurrent requests don't blur the attribution.
+
+Usage:
+    python scripts/load_test.py --database epet_loadtest --users 200 --products 1000 \\
+        --concurrency 50 --duration 30
+
+Requires httpx (`pip install httpx`).
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("httpx is required for the load test: pip install httpx")
+
+from pymongo import monitoring
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.database import settings, db, mongo_client_options, redact_mongo_url
+from app.auth import create_access_token, get_password_hash
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts MongoDB commands issued by the driver"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# ============= SEEDING =============
+
+async def seed(database, num_users: int, num_products: int, num_orders: int):
+    """Drop and recreate the load-test collections with synthetic data"""
+    for name in ["users", "categories", "subcategories", "inventory", "carts",
+                 "cart_items", "orders", "order_items", "guest_wishlists"]:
+        await database[name].drop()
+
+    # bcrypt is deliberately slow; hash once and share it across synthetic users
+    password_hash = get_password_hash("loadtest-password")
+    now = datetime.utcnow()
+
+    users = [{
+        "username": f"shopper{i}",
+        "email": f"shopper{i}@loadtest.local",
+        "full_name": f"Shopper {i}",
+        "password_hash": password_hash,
+        "role": "user",
+        "status": "active",
+        "register_time": now,
+        "last_login_time": now
+    } for i in range(num_users)]
+    users.append({
+        "username": "loadtest-admin",
+        "email": "admin@loadtest.local",
+        "full_name": "Load Test Admin",
+        "password_hash": password_hash,
+        "role": "admin",
+        "status": "active",
+        "register_time": now,
+        "last_login_time": now
+    })
+    result = await database.users.insert_many(users)
+    user_ids = [str(_id) for _id in result.inserted_ids]
+
+    categories = [{"name": name, "icon": None, "image_url": None, "coming_soon": False}
+                  for name in ["dogs", "cats", "birds", "fishes"]]
+    result = await database.categories.insert_many(categories)
+    category_ids = [str(_id) for _id in result.inserted_ids]
+
+    subcategories = [{"name": sub, "category_id": cid}
+                     for cid in category_ids for sub in ["food", "toys", "accessories"]]
+    result = await database.subcategories.insert_many(subcategories)
+    subcategory_ids = [str(_id) for _id in result.inserted_ids]
+
+    inventory = []
+    for i in range(num_products):
+        sub_index = random.randrange(len(subcategory_ids))
+        inventory.append({
+            "name": f"Product {i}",
+            "description": "Synthetic product used by the load test. " * 3,
+            "price": round(random.uniform(100, 5000), 2),
+            "stock": 1_000_000,
+            "category_id": subcategories[sub_index]["category_id"],
+            "subcategory_id": subcategory_ids[sub_index],
+            "images": [f"https://cdn.loadtest.local/p{i}.jpg"],
+            "weight": "1kg",
+            "brand": f"Brand {i % 20}",
+            "age_range": random.choice(["puppy", "adult", "senior", None]),
+            "rating": round(random.uniform(1, 5), 1),
+            "num_reviews": random.randint(0, 500),
+            "discount": random.choice([0.0, 5.0, 10.0]),
+            "is_visible": True
+        })
+    result = await database.inventory.insert_many(inventory)
+    inventory_ids = [str(_id) for _id in result.inserted_ids]
+
+    # Historical orders so the admin dashboard has something to aggregate
+    for start in range(0, num_orders, 1000):
+        orders = []
+        for _ in range(min(1000, num_orders - start)):
+            total = round(random.uniform(500, 10000), 2)
+            orders.append({
+                "user_id": random.choice(user_ids[:-1]),
+                "order_time": now - timedelta(minutes=random.randint(0, 60 * 24 * 90)),
+                "payment_type": "cod",
+                "status": random.choice(["pending", "in_progress", "dispatched", "delivered", "cancelled"]),
+                "first_name": "Load", "last_name": "Test", "email": "shopper@loadtest.local",
+                "phone": "0000000000", "address": "1 Test Street", "city": "Testville", "zip_code": "00000",
+                "subtotal": total, "delivery_charges": 0.0, "total": total
+            })
+        result = await database.orders.insert_many(orders)
+        await database.order_items.insert_many([{
+            "order_id": str(order_id),
+            "inventory_id": random.choice(inventory_ids),
+            "price": order["total"],
+            "quantity": 1,
+            "product_name": "Product",
+            "product_image": None
+        } for order_id, order in zip(result.inserted_ids, orders)])
+
+    return {
+        "user_tokens": [create_access_token({"sub": f"shopper{i}"}, timedelta(hours=6)) for i in range(num_users)],
+        "admin_token": create_access_token({"sub": "loadtest-admin"}, timedelta(hours=6)),
+        "category_ids": category_ids,
+        "inventory": [{"id": _id, "name": item["name"], "price": item["price"]}
+                      for _id, item in zip(inventory_ids, inventory)]
+    }
+
+
+# ============= SCENARIOS =============
+
+class Shopper:
+    """One virtual user; each scenario is a short sequence of requests"""
+
+    def __init__(self, client, data, record):
+        self.client = client
+        self.data = data
+        self.record = record
+        self.token = random.choice(data["user_tokens"])
+        self.guest_id = f"guest-{uuid.uuid4().hex}"
+
+    async def request(self, name, method, url, token=None, **kwargs):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        self.record(name, (time.perf_counter() - start) * 1000, ok)
+
+    def product(self):
+        return random.choice(self.data["inventory"])
+
+    async def browse(self):
+        await self.request("GET /categories/", "GET", "/categories/")
+        category_id = random.choice(self.data["category_ids"])
+        await self.request("GET /inventory/?category_id", "GET", "/inventory/", params={"category_id": category_id})
+        await self.request("GET /inventory/{id}", "GET", f"/inventory/{self.product()['id']}")
+
+    async def add_to_cart(self):
+        product = self.product()
+        await self.request("GET /inventory/{id}", "GET", f"/inventory/{product['id']}")
+        await self.request("POST /cart/items", "POST", "/cart/items", token=self.token,
+                           json={"inventory_id": product["id"], "quantity": random.randint(1, 3)})
+
+    async def guest_sync(self):
+        items = [{"product": dict(p), "quantity": random.randint(1, 3)}
+                 for p in random.sample(self.data["inventory"], k=random.randint(1, 5))]
+        await self.request("POST /cart/{guest_id}/sync", "POST", f"/cart/{self.guest_id}/sync", json={"items": items})
+        await self.request("GET /cart/{guest_id}", "GET", f"/cart/{self.guest_id}")
+
+    async def checkout(self):
+        await self.request("POST /cart/items", "POST", "/cart/items", token=self.token,
+                           json={"inventory_id": self.product()["id"], "quantity": 1})
+        await self.request("POST /orders/", "POST", "/orders/", token=self.token, json={
+            "payment_type": "cod", "first_name": "Load", "last_name": "Test",
+            "email": "shopper@loadtest.local", "phone": "0000000000",
+            "address": "1 Test Street", "city": "Testville", "zip_code": "00000"
+        })
+
+    async def admin(self):
+        token = self.data["admin_token"]
+        await self.request("GET /admin/dashboard/stats", "GET", "/admin/dashboard/stats", token=token)
+        await self.request("GET /admin/dashboard/recent-orders", "GET", "/admin/dashboard/recent-orders", token=token)
+
+
+SCENARIO_WEIGHTS = {
+    "browse": 45,
+    "add_to_cart": 20,
+    "guest_sync": 15,
+    "checkout": 15,
+    "admin": 5,
+}
+
+
+# ============= RUNNER =============
+
+def make_client(base_url):
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=30)
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=30)
+
+
+async def profile_mongo_ops(client, data, counter):
+    """Run every scenario once with a single user and attribute Mongo commands per endpoint"""
+    ops = {}
+
+    def record(name, elapsed_ms, ok):
+        pass
+
+    shopper = Shopper(client, data, record)
+
+    async def measured(name, method, url, token=None, **kwargs):
+        before = counter.count
+        await Shopper.request(shopper, name, method, url, token=token, **kwargs)
+        ops[name] = counter.count - before
+
+    shopper.request = measured
+    for scenario in SCENARIO_WEIGHTS:
+        await getattr(shopper, scenario)()
+    return ops
+
+
+async def run_load(client, data, concurrency, duration):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    def record(name, elapsed_ms, ok):
+        latencies[name].append(elapsed_ms)
+        if not ok:
+            errors[name] += 1
+
+    scenarios = list(SCENARIO_WEIGHTS)
+    weights = list(SCENARIO_WEIGHTS.values())
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user():
+        shopper = Shopper(client, data, record)
+        while time.perf_counter() < deadline:
+            scenario = random.choices(scenarios, weights=weights)[0]
+            await getattr(shopper, scenario)()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[virtual_user() for _ in range(concurrency)])
+    return latencies, errors, time.perf_counter() - started
+
+
+def percentile(values, q):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def report(latencies, errors, elapsed, ops_per_endpoint, total_ops):
+    total_requests = sum(len(v) for v in latencies.values())
+    print(f"\nRequests: {total_requests} in {elapsed:.1f}s -> {total_requests / elapsed:.1f} req/s")
+    if total_ops is not None and total_requests:
+        print(f"MongoDB commands per request (overall): {total_ops / total_requests:.2f}")
+    print()
+    print(f"{'endpoint':<38} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'mongo ops':>10}")
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        print(
+            f"{name:<38} {len(values):>7} {len(values) / elapsed:>8.1f} "
+            f"{percentile(values, 50):>8.2f} {percentile(values, 95):>8.2f} {percentile(values, 99):>8.2f} "
+            f"{errors[name]:>7} {ops_per_endpoint.get(name, '-'):>10}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="epet_loadtest", help="Database to seed and test against")
+    parser.add_argument("--base-url", default=None, help="Target a running server instead of in-process ASGI")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.database == "epet_db":
+        sys.exit("Refusing to seed the default epet_db database; pass a throwaway --database")
+
+    random.seed(args.seed)
+    settings.DATABASE_NAME = args.database
+    counter = CommandCounter()
+
+    print(f"MongoDB: {redact_mongo_url(settings.MONGODB_URL)} / {args.database}")
+    seed_client = AsyncIOMotorClient(settings.MONGODB_URL, **mongo_client_options())
+    print(f"Seeding {args.users} users, {args.products} products, {args.orders} orders...")
+    data = await seed(seed_client[args.database], args.users, args.products, args.orders)
+    seed_client.close()
+
+    in_process = args.base_url is None
+    if in_process:
+        # Same client the app would build, plus a listener to count commands
+        db.client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[counter], **mongo_client_options())
+
+    async with make_client(args.base_url) as client:
+        ops_per_endpoint = await profile_mongo_ops(client, data, counter) if in_process else {}
+        print(f"Running {args.concurrency} virtual users for {args.duration:.0f}s...")
+        ops_before = counter.count
+        latencies, errors, elapsed = await run_load(client, data, args.concurrency, args.duration)
+        total_ops = counter.count - ops_before if in_process else None
+
+    report(latencies, errors, elapsed, ops_per_endpoint, total_ops)
+
+    if in_process:
+        db.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+"""
+Rebuild the trending / best-seller counters (`sales_rankings`) from orders.
+
+Run once after deploying the rankings endpoints, after moving
+TRENDING_EPOCH or changing TRENDING_HALF_LIFE_HOURS, or whenever the
+counters are suspected to have drifted. Streams orders in batches and swaps
+the rebuilt counters in at the end.
+
+Usage:
+    python scripts/rebuild_rankings.py --batch-size 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.rankings import rebuild_rankings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        started = time.perf_counter()
+        processed = await rebuild_rankings(db, args.batch_size)
+        print(f"Rebuilt sales rankings from {processed} orders in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
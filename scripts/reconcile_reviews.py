@@ -0,0 +1,46 @@
+"""
+Verify each inventory item's review aggregates (rating_sum, num_reviews,
+rating) against the `reviews` collection and fix the ones that drifted.
+
+The aggregates are maintained with $inc on every review write; run this
+after deploying reviews (to replace hand-set ratings) and then periodically.
+
+Usage:
+    python scripts/reconcile_reviews.py --batch-size 500
+    python scripts/reconcile_reviews.py --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.reviews import reconcile_review_aggregates
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report mismatches without fixing them")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        started = time.perf_counter()
+        report = await reconcile_review_aggregates(db, args.batch_size, fix=not args.dry_run)
+        elapsed = time.perf_counter() - started
+    finally:
+        await close_mongo_connection()
+
+    for detail in report["details"]:
+        print(f"{detail['inventory_id']}: stored {detail['stored']}, expected {detail['expected']}")
+    action = "found" if args.dry_run else "fixed"
+    print(f"Checked {report['checked']} items in {elapsed:.1f}s, {action} {report['mismatched']} mismatched")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
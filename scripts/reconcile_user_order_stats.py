@@ -0,0 +1,48 @@
+"""
+Verify each user's order counters (`user_order_stats`: order_count,
+total_spent, last_order_time) against their non-cancelled orders and fix the
+ones that drifted.
+
+The counters are maintained on every order write and seeded from a
+customer's order history the first time they are needed; run this
+periodically to catch drift.
+
+Usage:
+    python scripts/reconcile_user_order_stats.py --batch-size 500
+    python scripts/reconcile_user_order_stats.py --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.customer_stats import reconcile_user_order_stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report mismatches without fixing them")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        started = time.perf_counter()
+        report = await reconcile_user_order_stats(db, args.batch_size, fix=not args.dry_run)
+        elapsed = time.perf_counter() - started
+    finally:
+        await close_mongo_connection()
+
+    for detail in report["details"]:
+        print(f"{detail['user_id']}: stored {detail['stored']}, expected {detail['expected']}")
+    action = "found" if args.dry_run else "fixed"
+    print(f"Checked {report['checked']} users in {elapsed:.1f}s, {action} {report['mismatched']} mismatched")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Production entry point.
+
+Runs the app with one worker process per CPU core (override with
+WEB_CONCURRENCY), uvloop + httptools, tuned keep-alive and listen backlog.
+Uses gunicorn with uvicorn workers when gunicorn is installed (Linux/macOS),
+otherwise uvicorn's own multi-process supervisor. Both drain in-flight
+requests on SIGTERM for up to SERVER_GRACEFUL_TIMEOUT_SECONDS.
+
+For local development keep using `python main.py` / `uvicorn main:app --reload`.
+
+Usage:
+    python serve.py
+    WEB_CONCURRENCY=4 SERVER_PORT=8080 python serve.py
+"""
+import multiprocessing
+import sys
+from app.database import settings
+
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    # Async workers: one event loop per core is enough to saturate the CPU
+    return max(1, multiprocessing.cpu_count())
+
+
+def event_loop() -> str:
+    try:
+        import uvloop  # noqa: F401
+        return "uvloop"
+    except ImportError:
+        return "asyncio"
+
+
+def http_protocol() -> str:
+    try:
+        import httptools  # noqa: F401
+        return "httptools"
+    except ImportError:
+        return "h11"
+
+
+def run_gunicorn(workers: int):
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class TunedUvicornWorker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": event_loop(), "http": http_protocol(), "lifespan": "on"}
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+                "workers": workers,
+                "worker_class": TunedUvicornWorker,
+                "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+                "backlog": settings.SERVER_BACKLOG,
+                "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+                "timeout": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS * 2,
+                # Import the app in each worker, after fork, so every worker builds its own Mongo pool
+                "preload_app": False,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+
+def run_uvicorn(workers: int):
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop=event_loop(),
+        http=http_protocol(),
+        lifespan="on",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        proxy_headers=True,
+        access_log=False,
+    )
+
+
+def main():
+    workers = worker_count()
+    print(f"Starting PawStore API on {settings.SERVER_HOST}:{settings.SERVER_PORT} "
+          f"with {workers} worker(s), loop={event_loop()}, http={http_protocol()}")
+
+    if sys.platform != "win32":
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            pass
+        else:
+            run_gunicorn(workers)
+            return
+    run_uvicorn(workers)
+
+
+if __name__ == "__main__":
+    main()